@@ -15,7 +15,8 @@ setup(
 	license=open('LICENSE', encoding='utf-8').read(),
 	url='https://github.com/alexsilva/django-xadmin',
 	download_url='https://github.com/alexsilva/django-xadmin/archive/python3-dj32.zip',
-	packages=['xadmin', 'xadmin.migrations', 'xadmin.plugins', 'xadmin.templatetags', 'xadmin.views'],
+	packages=['xadmin', 'xadmin.management', 'xadmin.management.commands', 'xadmin.migrations', 'xadmin.plugins',
+	          'xadmin.templatetags', 'xadmin.views'],
 	include_package_data=True,
 	install_requires=[
 		'django>=3,<5',
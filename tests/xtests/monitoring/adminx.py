@@ -0,0 +1,8 @@
+from __future__ import absolute_import
+
+from xadmin.sites import AdminSite
+from .models import Entry
+
+site = AdminSite('monitoring')
+
+site.register(Entry)
@@ -0,0 +1,143 @@
+from __future__ import absolute_import
+
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+
+from base import BaseTest
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.template import engines
+from django.template.response import TemplateResponse
+from django.test import override_settings
+
+import xadmin
+from xadmin.metrics import Metrics, metrics, get_metrics_config, get_aggregated_metrics, write_metrics_file, \
+	METRICS_FILE, METRICS_ARCHIVE_FILE
+from xadmin.models import SlowRequest
+from .adminx import site
+from .models import Entry
+
+
+def query_view(request):
+	return HttpResponse(Entry.objects.count())
+
+
+query_view.need_site_permission = False
+
+
+class MetricsTest(BaseTest):
+
+	def test_render(self):
+		registry = Metrics()
+		labels = (('view', 'ListAdminView'), ('model', 'monitoring.entry'))
+		registry.inc('xadmin_requests_total', labels + (('status', 200),))
+		registry.observe('xadmin_request_queries', labels, 7, (5, 10))
+		other = Metrics()
+		other.load(json.loads(json.dumps(registry.dump())))
+		registry.load(other.dump())
+		output = registry.render()
+		self.assertIn('# TYPE xadmin_requests_total counter\n'
+		              'xadmin_requests_total{view="ListAdminView",model="monitoring.entry",status="200"} 2\n', output)
+		self.assertIn('xadmin_request_queries_bucket{view="ListAdminView",model="monitoring.entry",le="5"} 0\n'
+		              'xadmin_request_queries_bucket{view="ListAdminView",model="monitoring.entry",le="10"} 2\n'
+		              'xadmin_request_queries_bucket{view="ListAdminView",model="monitoring.entry",le="+Inf"} 2\n'
+		              'xadmin_request_queries_sum{view="ListAdminView",model="monitoring.entry"} 14\n', output)
+
+	@override_settings(XADMIN_METRICS={'enabled': True})
+	def test_metrics_view(self):
+		request = self._mocked_request('test/')
+		site.admin_view(query_view)(request)
+		key = ('xadmin_request_queries', (('view', 'query_view'), ('model', '')))
+		self.assertEqual(metrics.histograms[key][3:], [1])
+
+		response = site.metrics_view(request)
+		self.assertIn('xadmin_requests_total{view="query_view",model="",method="GET",status="200"}',
+		              response.content.decode())
+		request.user = User.objects.create_user('staff', 'staff@example.com', 'staff', is_staff=True)
+		self.assertRaises(PermissionDenied, site.metrics_view, request)
+
+
+	@override_settings(XADMIN_METRICS={'enabled': True})
+	def test_view_error(self):
+		def error_view(request):
+			raise ValueError
+		error_view.need_site_permission = False
+
+		with self.assertRaises(ValueError):
+			site.admin_view(error_view)(self._mocked_request('test/'))
+		key = ('xadmin_requests_total', (('view', 'error_view'), ('model', ''), ('method', 'GET'), ('status', 500)))
+		self.assertEqual(metrics.counters[key], 1)
+
+	@override_settings(XADMIN_METRICS={'enabled': True})
+	def test_template_response(self):
+		def template_view(request):
+			return TemplateResponse(request, engines['django'].from_string('{{ value }}'), {'value': 'ok'})
+		template_view.need_site_permission = False
+
+		response = site.admin_view(template_view)(self._mocked_request('test/'))
+		# the response is rendered by the handler, after the template response middleware
+		self.assertFalse(response.is_rendered)
+		key = ('xadmin_requests_total', (('view', 'template_view'), ('model', ''), ('method', 'GET'), ('status', 200)))
+		self.assertNotIn(key, metrics.counters)
+		response.context_data['value'] = 'changed'
+		response.render()
+		self.assertEqual(response.content, b'changed')
+		self.assertEqual(metrics.counters[key], 1)
+
+	def test_stopped_processes(self):
+		directory = tempfile.mkdtemp()
+		process = subprocess.Popen([sys.executable, '-c', ''])
+		process.wait()
+		registry = Metrics()
+		registry.inc('xadmin_export_rows_total', (('model', 'stopped'), ('format', 'csv')), 3)
+		stopped_path = os.path.join(directory, METRICS_FILE % ('%d_test' % process.pid))
+		write_metrics_file(stopped_path, registry.dump())
+
+		config = dict(get_metrics_config(), directory=directory)
+		key = ('xadmin_export_rows_total', (('model', 'stopped'), ('format', 'csv')))
+		for i in range(2):
+			# the metrics of the stopped process are moved to the archive and still counted once
+			self.assertEqual(get_aggregated_metrics(config).counters[key], 3)
+		self.assertFalse(os.path.exists(stopped_path))
+		self.assertTrue(os.path.exists(os.path.join(directory, METRICS_ARCHIVE_FILE)))
+
+
+class SlowRequestTest(BaseTest):
+
+	def get_response(self):
+		return site.admin_view(query_view)(self._mocked_request('test/?q=1'))
+
+	@override_settings(XADMIN_SLOW_REQUESTS={'enabled': True, 'threshold': 0})
+	def test_log(self):
+		self.get_response()
+		record = SlowRequest.objects.get()
+		self.assertEqual((record.view, record.query_string, record.queries, record.user.username),
+		                 ('query_view', 'q=1', 1, 'admin'))
+		self.assertEqual(record.hooks_json(), [])
+
+	@override_settings(XADMIN_SLOW_REQUESTS={'enabled': True, 'threshold': 0, 'sample': 0})
+	def test_sample(self):
+		self.get_response()
+		self.assertFalse(SlowRequest.objects.exists())
+
+	def test_prune(self):
+		for days in (40, 31, 1):
+			record = SlowRequest.objects.create(view='ListAdminView', method='GET', path='/', status=200, duration=1,
+			                                    queries=1)
+			SlowRequest.objects.filter(pk=record.pk).update(
+				request_time=record.request_time - datetime.timedelta(days=days))
+		output = StringIO()
+		call_command('xadmin_prune_slow_requests', batch_size=1, stdout=output)
+		self.assertIn('2 slow requests removed', output.getvalue())
+		self.assertEqual(SlowRequest.objects.count(), 1)
+
+	def test_admin_not_registered(self):
+		# the records are only listed when the slow requests are logged
+		self.assertNotIn(SlowRequest, xadmin.site._registry)
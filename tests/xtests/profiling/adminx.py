@@ -0,0 +1,23 @@
+from __future__ import absolute_import
+
+from xadmin.sites import AdminSite
+from xadmin.views import BaseAdminView, filter_hook
+from .models import Item
+
+site = AdminSite('profiling')
+
+
+class HookView(BaseAdminView):
+
+	@filter_hook
+	def get_title(self):
+		return "title"
+
+	@filter_hook
+	def get_nothing(self):
+		return None
+
+
+site.register_view(r"^hooks/$", HookView, 'hooks')
+
+site.register(Item)
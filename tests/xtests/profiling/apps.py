@@ -0,0 +1,7 @@
+#!/usr/bin/env python
+# coding=utf-8
+from django.apps import AppConfig
+
+
+class ProfilingApp(AppConfig):
+	name = "profiling"
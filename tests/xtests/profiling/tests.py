@@ -0,0 +1,200 @@
+from __future__ import absolute_import
+
+import json
+import tempfile
+import tracemalloc
+
+from base import BaseTest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import engines
+from django.template.response import TemplateResponse
+from django.test import override_settings
+
+from xadmin import profiler
+from xadmin.profiler import HookProfiler, current_hook_profiler, load_request_profile, normalize_sql
+from xadmin.sites import AdminSite
+from xadmin.views import BaseAdminPlugin
+from .adminx import site, HookView
+from .models import Item
+
+
+class HookPluginA(BaseAdminPlugin):
+
+	def get_title(self, title):
+		return "%s A" % title
+
+
+class HookPluginB(BaseAdminPlugin):
+
+	def get_title(self, title):
+		return "%s B" % title
+
+	get_title.priority = 20
+
+
+class HookPluginSQL(BaseAdminPlugin):
+
+	def get_title(self, title):
+		for pk in (1, 1, 2):
+			Item.objects.filter(pk=pk).exists()
+		return title
+
+
+class ProfilerTest(BaseTest):
+
+	def get_template_view(self, view, content='{{ view.get_title }}'):
+		# the hook runs while the template is rendered, after the view returned
+		def template_view(request):
+			return TemplateResponse(request, engines['django'].from_string(content), {'view': view})
+		template_view.need_site_permission = False
+		return view.admin_site.admin_view(template_view)
+
+	def get_view(self, *plugins, url='hooks/'):
+		hook_site = AdminSite('hooks')
+		hook_site.register_view(r"^hooks/$", HookView, 'hooks')
+		hook_site.register_plugins(HookView, *plugins)
+		view = hook_site.get_view_class(HookView)()
+		view.setup(self._mocked_request(url))
+		return view
+
+
+class HookProfilerTest(ProfilerTest):
+
+	def test_hook_profiler(self):
+		view = self.get_view(HookPluginA, HookPluginB)
+		profiler = HookProfiler()
+		token = current_hook_profiler.set(profiler)
+		try:
+			self.assertEqual(view.get_title(), "title B A")
+			view.get_title()
+			view.get_nothing()
+		finally:
+			current_hook_profiler.reset(token)
+		calls = {(r['owner'], r['name']): r['calls'] for r in profiler.get_records()}
+		self.assertEqual(calls, {('HookView', 'get_title'): 2, ('HookPluginA', 'get_title'): 2,
+		                         ('HookPluginB', 'get_title'): 2, ('HookView', 'get_nothing'): 1})
+		self.assertIn('HookPluginA.get_title;dur=', profiler.get_server_timing())
+
+	@override_settings(XADMIN_HOOK_PROFILER={'enabled': True, 'log': False})
+	def test_server_timing_header(self):
+		view = self.get_view(HookPluginA)
+
+		def title_view(request):
+			return HttpResponse(view.get_title())
+		title_view.need_site_permission = False
+
+		response = view.admin_site.admin_view(title_view)(view.request)
+		self.assertIn('HookPluginA.get_title', response['Server-Timing'])
+		self.assertIsNone(current_hook_profiler.get())
+
+	@override_settings(XADMIN_HOOK_PROFILER={'enabled': True, 'log': False})
+	def test_template_response(self):
+		view = self.get_view(HookPluginA)
+		response = self.get_template_view(view)(view.request)
+		# the template response middleware still gets an unrendered response
+		self.assertFalse(response.is_rendered)
+		self.assertNotIn('Server-Timing', response)
+		response = response.render()
+		self.assertEqual(response.content, b'title A')
+		self.assertIn('HookPluginA.get_title', response['Server-Timing'])
+		self.assertIsNone(current_hook_profiler.get())
+
+
+class RequestProfilerTest(BaseTest):
+
+	def setUp(self):
+		super(RequestProfilerTest, self).setUp()
+		cache.clear()
+		self.directory = tempfile.mkdtemp()
+		self.admin = self._create_superuser('admin')
+
+	def get_response(self, url='hooks/?_profile=1', user=None):
+		def title_view(request):
+			return HttpResponse('title')
+		title_view.need_site_permission = False
+		request = self._mocked_request(url, user or self.admin)
+		return site.admin_view(title_view)(request)
+
+	def test_profile(self):
+		with override_settings(XADMIN_REQUEST_PROFILER={'enabled': True, 'directory': self.directory}):
+			response = self.get_response()
+			profile_id = response['X-Xadmin-Profile'].rstrip('/').rsplit('/', 1)[-1]
+			profile = load_request_profile(profile_id)
+		self.assertEqual(profile['status'], 200)
+		self.assertTrue(profile['functions'])
+		self.assertIsNone(load_request_profile('../' + profile_id))
+
+	def test_not_requested(self):
+		with override_settings(XADMIN_REQUEST_PROFILER={'enabled': True, 'directory': self.directory}):
+			self.assertNotIn('X-Xadmin-Profile', self.get_response('hooks/'))
+			user = User.objects.create_user('staff', 'staff@example.com', 'staff', is_staff=True)
+			self.assertNotIn('X-Xadmin-Profile', self.get_response(user=user))
+		self.assertNotIn('X-Xadmin-Profile', self.get_response())
+
+	def test_concurrent_profile(self):
+		with override_settings(XADMIN_REQUEST_PROFILER={'enabled': True, 'directory': self.directory}):
+			# tracemalloc and cProfile are global: a request profiled by another thread is not profiled again
+			with profiler._request_profile_lock:
+				response = self.get_response()
+			self.assertEqual(response.content, b'title')
+			self.assertNotIn('X-Xadmin-Profile', response)
+			self.assertIn('X-Xadmin-Profile', self.get_response())
+
+	def test_profile_failure(self):
+		# the directory is a file: the profile can not be stored
+		with tempfile.NamedTemporaryFile() as fp, \
+				override_settings(XADMIN_REQUEST_PROFILER={'enabled': True, 'directory': fp.name}):
+			with self.assertLogs('xadmin.profiler', 'ERROR'):
+				response = self.get_response()
+		self.assertEqual(response.content, b'title')
+		self.assertNotIn('X-Xadmin-Profile', response)
+		self.assertFalse(tracemalloc.is_tracing())
+
+	def test_rate_limit(self):
+		with override_settings(XADMIN_REQUEST_PROFILER={'enabled': True, 'directory': self.directory,
+		                                                'rate': (2, 3600)}):
+			profiled = ['X-Xadmin-Profile' in self.get_response() for i in range(3)]
+		self.assertEqual(profiled, [True, True, False])
+
+
+class SQLInspectorTest(ProfilerTest):
+
+	def test_normalize_sql(self):
+		self.assertEqual(normalize_sql("SELECT a FROM t WHERE b = 'x' AND c IN (%s, %s, 3) LIMIT 21"),
+		                 "SELECT a FROM t WHERE b = ? AND c IN (...) LIMIT ?")
+
+	@override_settings(XADMIN_SQL_INSPECTOR={'enabled': True, 'log': False})
+	def test_report(self):
+		view = self.get_view(HookPluginSQL, url='hooks/?_sql')
+
+		def title_view(request):
+			return HttpResponse('<html><body>%s</body></html>' % view.get_title())
+		title_view.need_site_permission = False
+
+		response = view.admin_site.admin_view(title_view)(view.request)
+		report = response.sql_inspection
+		self.assertEqual((report['count'], report['duplicates'], report['similar']), (3, 1, 3))
+		self.assertEqual(report['groups'][0]['sources'], [{'source': 'HookPluginSQL.get_title', 'count': 3}])
+		self.assertContains(response, 'sql-inspector')
+
+		request = self._mocked_request('hooks/?_sql=json', view.request.user)
+		response = view.admin_site.admin_view(title_view)(request)
+		self.assertEqual(json.loads(response.content)['count'], 3)
+
+	@override_settings(XADMIN_SQL_INSPECTOR={'enabled': True, 'log': False})
+	def test_template_response(self):
+		view = self.get_view(HookPluginSQL, url='hooks/?_sql')
+		template_view = self.get_template_view(view, '<html><body>{{ view.get_title }}</body></html>')
+		response = template_view(view.request)
+		self.assertFalse(response.is_rendered)
+		response = response.render()
+		self.assertEqual(response.sql_inspection['count'], 3)
+		self.assertEqual(response.sql_inspection['groups'][0]['sources'],
+		                 [{'source': 'HookPluginSQL.get_title', 'count': 3}])
+		self.assertContains(response, 'sql-inspector')
+
+		request = self._mocked_request('hooks/?_sql=json', view.request.user)
+		response = template_view(request).render()
+		self.assertEqual(json.loads(response.content)['count'], 3)
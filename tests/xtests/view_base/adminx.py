@@ -1,8 +1,8 @@
 from __future__ import absolute_import
 
 from xadmin.sites import AdminSite
-from xadmin.views import BaseAdminView, CommAdminView, ListAdminView
-from .models import ModelA, ModelB
+from xadmin.views import BaseAdminView, CommAdminView, ListAdminView, register_builtin_views
+from .models import ModelA, ModelB, ModelC, ModelD
 
 site = AdminSite('views_base')
 
@@ -19,16 +19,29 @@ class TestBaseView(BaseAdminView):
 class TestCommView(CommAdminView):
 	global_models_icon = {ModelB: 'test'}
 
+	def get(self, request, *args, **kwargs):
+		return self.template_response(self.menu_template, self.get_context())
+
 
 class TestAView(BaseAdminView):
 	pass
 
 
+class TestLazyView(BaseAdminView):
+	pass
+
+
+class ModelCAdmin:
+	list_display = ('name', 'a')
+	list_only_fields = True
+
+
 class OptionA:
 	option_attr = 'option_test'
 
 
 site.register_modelview(r'^list$', ListAdminView, name='%s_%s_list')
+register_builtin_views(site)
 
 site.register_view(r"^test/base$", TestBaseView, 'test')
 site.register_view(r"^test/comm$", TestCommView, 'test_comm')
@@ -36,3 +49,5 @@ site.register_view(r"^test/a$", TestAView, 'test_a')
 
 site.register(ModelA, ModelAAdmin)
 site.register(ModelB)
+site.register(ModelC, ModelCAdmin)
+site.register(ModelD)
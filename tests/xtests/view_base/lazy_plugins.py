@@ -0,0 +1,9 @@
+from xadmin.views import BaseAdminPlugin
+from .adminx import site, TestLazyView
+
+
+class LazyPlugin(BaseAdminPlugin):
+	pass
+
+
+site.register_plugin(LazyPlugin, TestLazyView)
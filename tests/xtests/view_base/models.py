@@ -7,3 +7,14 @@ class ModelA(models.Model):
 
 class ModelB(models.Model):
 	name = models.CharField(max_length=64)
+
+
+class ModelC(models.Model):
+	name = models.CharField(max_length=64)
+	description = models.TextField(blank=True)
+	a = models.ForeignKey(ModelA, on_delete=models.CASCADE, related_name='cs')
+	bs = models.ManyToManyField(ModelB, blank=True)
+
+
+class ModelD(models.Model):
+	created = models.DateTimeField()
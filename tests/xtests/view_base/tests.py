@@ -1,11 +1,30 @@
 from __future__ import absolute_import
 
+import datetime
+import sys
+from importlib import import_module
+
 from base import BaseTest
-from django.contrib.auth.models import User
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Prefetch
+from django.db.models.signals import post_delete
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.html import escape
+from django.utils.http import urlencode
+from django.utils import timezone
 
-from xadmin.views import ListAdminView
-from .adminx import site, ModelAAdmin, TestBaseView, TestCommView, TestAView, OptionA
-from .models import ModelA, ModelB
+from xadmin.models import get_cached_permissions, connect_data_version_signals, PERMISSION_VERSION_KEY, \
+	PERMISSION_USER_VERSION_KEY
+from xadmin.filters import manager
+from xadmin.sites import AdminSite
+from xadmin.views import ListAdminView, ModelAdminView, DetailAdminView, BaseAdminView, BaseAdminPlugin, filter_hook
+from xadmin.views.list import ResultItem, ResultRow
+from xadmin.views.base import get_hook_chains
+from .adminx import site, ModelAAdmin, TestBaseView, TestCommView, TestAView, TestLazyView, OptionA
+from .models import ModelA, ModelB, ModelC, ModelD
 
 
 class BaseAdminTest(BaseTest):
@@ -48,6 +67,405 @@ class BaseAdminTest(BaseTest):
 		# Admin User
 		self.assertTrue(self.test_view.has_model_perm(ModelA, 'change'))
 
+	def test_permission_resolver(self):
+		resolver = self.test_view.permission_resolver
+		test_a = self.test_view.get_view(TestAView, OptionA)
+		self.assertIs(test_a.permission_resolver, resolver)
+
+		self.assertTrue(self.test_view.has_model_perm(ModelA, 'view'))
+		self.assertIn(('view_base.view_modela', None), resolver._perms)
+
+		resolver._perms[('view_base.view_modela', None)] = False
+		resolver._perms[('view_base.change_modela', None)] = False
+		self.assertFalse(test_a.has_model_perm(ModelA, 'view'))
+
+	def test_query_state(self):
+		view = site.get_view_class(TestBaseView)()
+		view.setup(self._mocked_request('test/?a=1&b=2&b=3&_p_x=1', user=self.test_view.user))
+
+		self.assertIs(view.query_state, view.query_state)
+		self.assertEqual(view.get_query_string(), '?a=1&b=2&b=3&_p_x=1')
+		self.assertEqual(view.get_query_string({'c': 4}, remove=['_p_']), '?a=1&b=2&b=3&c=4')
+		self.assertEqual(view.get_query_string({'a': None, 'b': ['x y']}), '?b=x+y&_p_x=1')
+		# the state of the request is not changed
+		self.assertEqual(view.query_state['b'], ['2', '3'])
+
+	def test_query_params_override(self):
+		class ParamsView(TestBaseView):
+			def get_query_params(self):
+				params = super().get_query_params()
+				params.pop('b')
+				return params
+
+		view = site.get_view_class(ParamsView)()
+		view.setup(self._mocked_request('test/?a=1&b=2', user=self.test_view.user))
+		self.assertEqual(view.get_query_string(), '?a=1')
+		self.assertEqual(view.get_form_params(), view.get_form_params({'b': None}))
+		# the other views of the request use the parameters of the request
+		self.assertEqual(view.get_view(TestBaseView).get_query_string(), '?a=1&b=2')
+
+	def test_keyset_pagination(self):
+		for i in range(5):
+			ModelA.objects.create(name='a%d' % i)
+		opts = {'list_pagination': 'keyset', 'list_per_page': 2}
+		names, url = [], 'test/'
+		while url:
+			base_view = site.get_view_class(TestBaseView)()
+			base_view.setup(self._mocked_request(url, user=self.test_view.user))
+			list_view = base_view.get_model_view(ListAdminView, ModelA, opts=opts)
+			list_view.make_result_list()
+			self.assertTrue(list_view.keyset)
+			names.extend(obj.name for obj in list_view.result_list)
+			url = list_view.next_cursor and 'test/?_cursor=%s' % list_view.next_cursor
+
+		self.assertEqual(names, ['a4', 'a3', 'a2', 'a1', 'a0'])
+		self.assertTrue(list_view.prev_cursor)
+		self.assertFalse(list_view.has_more)
+
+	def test_keyset_datetime(self):
+		created = timezone.now().replace(microsecond=0)
+		objs = [ModelD.objects.create(created=created + datetime.timedelta(microseconds=i)) for i in range(5)]
+		opts = {'list_pagination': 'keyset', 'list_per_page': 2, 'ordering': ('-created', '-id')}
+		pks, url = [], 'test/'
+		while url:
+			base_view = site.get_view_class(TestBaseView)()
+			base_view.setup(self._mocked_request(url, user=self.test_view.user))
+			list_view = base_view.get_model_view(ListAdminView, ModelD, opts=opts)
+			list_view.make_result_list()
+			self.assertTrue(list_view.keyset)
+			pks.extend(obj.pk for obj in list_view.result_list)
+			url = list_view.next_cursor and 'test/?_cursor=%s' % list_view.next_cursor
+
+		# the rows differing by microseconds are not skipped
+		self.assertEqual(pks, [obj.pk for obj in reversed(objs)])
+
+	def test_keyset_count(self):
+		for i in range(5):
+			ModelA.objects.create(name='a%d' % i)
+		opts = {'list_pagination': 'keyset', 'list_per_page': 2, 'list_count_cap': 3}
+		base_view = site.get_view_class(TestBaseView)()
+		base_view.setup(self._mocked_request('test/', user=self.test_view.user))
+		list_view = base_view.get_model_view(ListAdminView, ModelA, opts=opts)
+		list_view.make_result_list()
+
+		# the total is not counted past the cap
+		self.assertEqual(list_view.get_count_strategy(), 'capped')
+		self.assertEqual(list_view.result_count, 3)
+		self.assertFalse(list_view.result_count_exact)
+		self.assertTrue(list_view.has_more)
+
+	def test_capped_count(self):
+		for i in range(5):
+			ModelA.objects.create(name='a%d' % i)
+		opts = {'list_count': 'capped', 'list_count_cap': 3, 'list_per_page': 2}
+
+		def make_list(url):
+			base_view = site.get_view_class(TestBaseView)()
+			base_view.setup(self._mocked_request(url, user=self.test_view.user))
+			list_view = base_view.get_model_view(ListAdminView, ModelA, opts=opts)
+			list_view.make_result_list()
+			return list_view
+
+		list_view = make_list('test/?all=')
+		self.assertEqual(str(list_view.result_count), '3+')
+		self.assertFalse(list_view.can_show_all)
+		self.assertTrue(list_view.multi_page)
+		self.assertEqual(len(list_view.result_list), 2)
+		self.assertTrue(list_view.has_more)
+
+		list_view = make_list('test/?p=2')
+		self.assertEqual(list_view.result_count, 5)
+		self.assertTrue(list_view.result_count_exact)
+		self.assertEqual(len(list_view.result_list), 1)
+		self.assertFalse(list_view.has_more)
+
+	@override_settings(XADMIN_COUNT_CACHE={'enabled': True})
+	def test_count_cache(self):
+		cache.clear()
+		connect_data_version_signals([ModelA])
+		for i in range(3):
+			ModelA.objects.create(name='a%d' % i)
+
+		def count(url='test/', count_cache=True):
+			base_view = site.get_view_class(TestBaseView)()
+			base_view.setup(self._mocked_request(url, user=self.test_view.user))
+			opts = {'list_per_page': 2, 'list_count_cache': count_cache}
+			list_view = base_view.get_model_view(ListAdminView, ModelA, opts=opts)
+			list_view.make_result_list()
+			return list_view.result_count
+
+		# the counts are only cached by the admins that enable it
+		self.assertEqual(count(count_cache=False), 3)
+		with self.assertNumQueries(2):
+			self.assertEqual(count('test/?p=1', count_cache=False), 3)
+
+		self.assertEqual(count(), 3)
+		with self.assertNumQueries(1):
+			# the second page only fetches its rows
+			self.assertEqual(count('test/?p=1'), 3)
+
+		ModelA.objects.create(name='a3')
+		self.assertEqual(count(), 4)
+		ModelA.objects.all().delete()
+		self.assertEqual(count(), 0)
+
+	def test_estimate_empty_filter(self):
+		list_view = self._get_list_view(ModelA, list_count='estimate')
+		connection.vendor = 'postgresql'
+		try:
+			self.assertEqual(list_view.get_count_estimate(ModelA.objects.filter(pk__in=[])), 0)
+		finally:
+			del connection.vendor
+		self.assertEqual(list_view.get_estimated_count(ModelA.objects.filter(pk__in=[])), 0)
+
+	def test_count_cache_signals(self):
+		class CountCacheAdmin:
+			list_count_cache = True
+
+		signal_site = AdminSite('count_cache')
+		signal_site.register(ModelA, CountCacheAdmin)
+		signal_site.register(ModelB)
+		with override_settings(XADMIN_COUNT_CACHE={'enabled': True}):
+			signal_site.init()
+		# the models of the admins without count cache keep their fast deletes
+		self.assertTrue(post_delete.has_listeners(ModelA))
+		self.assertFalse(post_delete.has_listeners(ModelB))
+
+	def test_window_count(self):
+		cache.clear()
+		for i in range(5):
+			ModelA.objects.create(name='a%d' % i)
+		opts = {'list_count': 'window', 'list_per_page': 2, 'list_count_cache': False}
+		for url, count, names, has_more in (('test/', 5, ['a4', 'a3'], True), ('test/?p=2', 5, ['a0'], False)):
+			base_view = site.get_view_class(TestBaseView)()
+			base_view.setup(self._mocked_request(url, user=self.test_view.user))
+			list_view = base_view.get_model_view(ListAdminView, ModelA, opts=opts)
+			with self.assertNumQueries(1):
+				list_view.make_result_list()
+			self.assertEqual(list_view.result_count, count)
+			self.assertEqual([obj.name for obj in list_view.result_list], names)
+			self.assertTrue(list_view.multi_page)
+			self.assertEqual(list_view.has_more, has_more)
+
+	def _get_list_view(self, model, url='test/', **opts):
+		base_view = site.get_view_class(TestBaseView)()
+		base_view.setup(self._mocked_request(url, user=self.test_view.user))
+		return base_view.get_model_view(ListAdminView, model, opts=opts)
+
+	def test_only_fields(self):
+		list_view = self._get_list_view(ModelC, list_only_fields=True, list_display=('name', 'a'))
+		queryset = list_view.get_list_queryset()
+		self.assertEqual(set(queryset.query.deferred_loading[0]), {'id', 'name', 'a'})
+		self.assertFalse(queryset.query.deferred_loading[1])
+
+		list_view = self._get_list_view(ModelC, list_only_fields=True, list_display=('name', '__str__'))
+		self.assertEqual(list_view.get_list_queryset().query.deferred_loading, (frozenset(), True))
+
+		list_view = self._get_list_view(ModelC, list_only_fields=True, list_display=('__str__',),
+		                                list_depends_on={'__str__': ('a__name',)})
+		self.assertEqual(list_view.get_list_only_fields(), ['id', 'a', 'a__name'])
+
+	def test_only_fields_page(self):
+		for i in range(5):
+			ModelC.objects.create(name='c%d' % i, description='x' * 1000, a=ModelA.objects.create(name='a%d' % i))
+		user = User.objects.create(username='staff_admin', is_superuser=True, is_staff=True)
+		self.client.force_login(user)
+		url = self.test_view.get_model_url(ModelC, 'changelist')
+
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		self.assertContains(response, 'c4')
+		rows = [query['sql'] for query in queries if 'view_base_modelc' in query['sql']]
+		self.assertFalse(any('description' in sql for sql in rows))
+		# the deferred fields are not loaded row by row
+		ModelC.objects.create(name='c5', a=ModelA.objects.create(name='a5'))
+		with self.assertNumQueries(len(queries)):
+			self.client.get(url)
+
+	def test_prefetch_related(self):
+		a = ModelA.objects.create(name='a')
+		b = ModelB.objects.create(name='b')
+		for i in range(3):
+			ModelC.objects.create(name='c%d' % i, a=a).bs.add(b)
+
+		list_view = self._get_list_view(ModelC, list_display=('name', 'bs', 'a__cs'))
+		self.assertEqual(list_view.get_list_prefetch_related(), ['bs', 'a__cs'])
+		list_view.make_result_list()
+		result_list = list(list_view.result_list)
+		with self.assertNumQueries(0):
+			for obj in result_list:
+				self.assertEqual([o.name for o in obj.bs.all()], ['b'])
+				self.assertEqual(len(obj.a.cs.all()), 3)
+
+		prefetch = Prefetch('bs', queryset=ModelB.objects.none())
+		list_view = self._get_list_view(ModelC, list_display=('name', 'bs'), list_prefetch_related=(prefetch,))
+		self.assertEqual(list_view.get_list_prefetch_related(), [prefetch])
+
+	def test_select_related(self):
+		list_view = self._get_list_view(ModelC, list_display=('name', 'a', 'a__name', 'bs', 'a_name'),
+		                                list_depends_on={'a_name': ('a__name',)})
+		self.assertEqual(list_view.get_list_select_related(), ['a'])
+
+		list_view = self._get_list_view(ModelC, 'test/?_cols=name.bs', list_display=('name', 'a__name', 'bs'))
+		self.assertEqual(list_view.get_list_select_related(), [])
+
+	def test_result_columns(self):
+		a = ModelA.objects.create(name='a')
+		c = ModelC.objects.create(name='c', a=a)
+		c.bs.add(ModelB.objects.create(name='b'))
+
+		list_view = self._get_list_view(ModelC, list_display=('name', 'a', 'bs', 'a__name'), list_display_links=('name',))
+		row = {'is_display_first': False, 'object': c}
+		self.assertEqual([str(list_view.result_item(c, field_name, row).text) for field_name in ('a', 'bs', 'a__name')],
+		                 [str(a), str(c.bs.get()), 'a'])
+		column = list_view.get_result_column('bs')
+		self.assertEqual(column.kind, 'field')
+		self.assertIs(list_view.get_result_column('bs'), column)
+		self.assertEqual(list_view.get_result_column('a__name').kind, 'lookup')
+
+	def test_result_item(self):
+		row = ResultRow()
+		item = ResultItem('name', row)
+		self.assertEqual(item.tagattrs, '')
+		self.assertIsNone(item._wraps)
+		item.classes.append('nowrap')
+		item.wraps.append('<b>%s</b>')
+		item.text = 'a&b'
+		self.assertEqual(item.tagattrs, ' class="nowrap"')
+		self.assertEqual(item.label, '<b>a&amp;b</b>')
+		# plugins may set their own attributes
+		item.export = True
+		row.css_class = 'odd'
+		self.assertTrue(item.export)
+
+	def test_list_query(self):
+		view = self.test_view.get_model_view(ModelAdminView, ModelA)
+		token = view.get_list_query_token('o=name&p=2')
+
+		view.request = self._mocked_request('test/?_lq=%s' % token, user=self.test_view.user)
+		self.assertEqual(view.get_list_query(), 'o=name&p=2')
+
+		view.request = self._mocked_request('test/?_lq=%s' % token[:-1], user=self.test_view.user)
+		self.assertEqual(view.get_list_query(), '')
+
+		# the token is carried on to the urls, merged into their query
+		view.request = self._mocked_request('test/?_lq=%s' % token, user=self.test_view.user)
+		self.assertEqual(view.add_list_query('/a/'), '/a/?' + urlencode({'_lq': token}))
+		self.assertEqual(view.add_list_query('/a/?x=1&_lq=old#f'), '/a/?' + urlencode({'x': 1, '_lq': token}) + '#f')
+		view.request = self._mocked_request('test/', user=self.test_view.user)
+		self.assertEqual(view.add_list_query('/a/?x=1'), '/a/?x=1')
+
+	def test_list_query_links(self):
+		obj = ModelA.objects.create(name='a')
+		list_view = self._get_list_view(ModelA, url='test/?o=name&p=0', list_display_links_details=True)
+		list_view.make_result_list()
+		token = list_view.get_list_query_token('o=name&p=0')
+		self.assertEqual(list_view.get_object_url(obj), list_view.model_admin_url('change', obj.pk) + '?' +
+		                 urlencode({'_lq': token}))
+		label = list_view.results()[0].cells[0].label
+		self.assertIn('data-res-uri="%s"' % escape(list_view.add_list_query(list_view.model_admin_url('detail', obj.pk))),
+		              label)
+		self.assertIn('data-edit-uri="%s"' % escape(list_view.get_object_url(obj)), label)
+
+	def test_list_query_redirects(self):
+		obj = ModelA.objects.create(name='a')
+		self.client.force_login(User.objects.create(username='staff_admin', is_superuser=True, is_staff=True))
+		query = urlencode({'_lq': self.test_view.get_model_view(ModelAdminView, ModelA).get_list_query_token('o=name')})
+
+		base_view = site.get_view_class(TestBaseView)()
+		base_view.setup(self._mocked_request('test/?' + query, user=self.test_view.user))
+		detail_view = base_view.get_model_view(DetailAdminView, ModelA, str(obj.pk))
+		detail_view.instance_forms()
+		context = detail_view.get_context()
+		self.assertEqual(context['change_url'], self.test_view.get_model_url(ModelA, 'change', obj.pk) + '?' + query)
+		delete_url = self.test_view.get_model_url(ModelA, 'delete', obj.pk) + '?' + query
+		self.assertEqual(context['delete_url'], delete_url)
+		response = self.client.post(delete_url, {'post': 'yes'})
+		self.assertRedirects(response, self.test_view.get_model_url(ModelA, 'changelist') + '?o=name',
+		                     fetch_redirect_response=False)
+
+
+class BulkPermissionBackend:
+	calls = []
+
+	def has_perm_bulk(self, user_obj, perm, objs):
+		self.calls.append((perm, len(objs)))
+		return [obj.name == 'allowed' for obj in objs]
+
+
+@override_settings(AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend',
+                                            'view_base.tests.BulkPermissionBackend'])
+class BulkPermissionTest(BaseTest):
+
+	def setUp(self):
+		super(BulkPermissionTest, self).setUp()
+		test_user = User.objects.create_user('test_user')
+		self.test_view = site.get_view_class(TestBaseView)()
+		self.test_view.setup(self._mocked_request('test/', user=test_user))
+		self.objs = [ModelA.objects.create(name=name) for name in ('allowed', 'denied', 'allowed')]
+		BulkPermissionBackend.calls = []
+
+	def test_has_object_perm_bulk(self):
+		values = self.test_view.has_object_perm_bulk(ModelA, 'change', self.objs)
+		self.assertEqual(values, [True, False, True])
+		self.assertEqual(BulkPermissionBackend.calls, [('view_base.change_modela', 3)])
+
+		# memoized for the request
+		self.assertFalse(self.test_view.has_object_perm(ModelA, 'change', obj=self.objs[1]))
+		self.assertEqual(len(BulkPermissionBackend.calls), 1)
+
+	def test_model_view_bulk(self):
+		model_view = self.test_view.get_model_view(ModelAdminView, ModelA)
+		# model permission only (like has_change_permission)
+		self.assertEqual(model_view.has_change_permission_bulk(self.objs), [False, False, False])
+
+
+@override_settings(XADMIN_PERMISSION_CACHE={'enabled': True, 'allow_local_cache': True})
+class PermissionCacheTest(BaseTest):
+
+	def setUp(self):
+		super(PermissionCacheTest, self).setUp()
+		cache.clear()
+		self.perm_user = User.objects.create_user('perm_user')
+
+	def get_permissions(self):
+		return get_cached_permissions(User.objects.get(pk=self.perm_user.pk))
+
+	def test_cached_permissions(self):
+		self.assertEqual(self.get_permissions(), frozenset())
+
+		self.perm_user.user_permissions.add(Permission.objects.get(codename='change_modela'))
+		self.assertEqual(self.get_permissions(), {'view_base.change_modela'})
+
+		user = User.objects.get(pk=self.perm_user.pk)
+		with self.assertNumQueries(0):
+			self.assertEqual(get_cached_permissions(user), {'view_base.change_modela'})
+
+	def test_group_invalidation(self):
+		group = Group.objects.create(name='perm_group')
+		self.perm_user.groups.add(group)
+		self.assertEqual(self.get_permissions(), frozenset())
+
+		group.permissions.add(Permission.objects.get(codename='view_modela'))
+		self.assertEqual(self.get_permissions(), {'view_base.view_modela'})
+
+		group.user_set.remove(self.perm_user)
+		self.assertEqual(self.get_permissions(), frozenset())
+
+	def test_evicted_version(self):
+		self.assertEqual(self.get_permissions(), frozenset())
+		# the permission is granted while the version keys are evicted from the cache
+		cache.delete_many([PERMISSION_VERSION_KEY, PERMISSION_USER_VERSION_KEY % self.perm_user.pk])
+		self.perm_user.user_permissions.add(Permission.objects.get(codename='change_modela'))
+		cache.delete_many([PERMISSION_VERSION_KEY, PERMISSION_USER_VERSION_KEY % self.perm_user.pk])
+		self.assertEqual(self.get_permissions(), {'view_base.change_modela'})
+
+	@override_settings(XADMIN_PERMISSION_CACHE={'enabled': True})
+	def test_local_cache(self):
+		with self.assertWarns(RuntimeWarning):
+			self.assertIsNone(self.get_permissions())
+
 
 class CommAdminTest(BaseTest):
 
@@ -60,3 +478,227 @@ class CommAdminTest(BaseTest):
 	def test_model_icon(self):
 		self.assertEqual(self.test_view.get_model_icon(ModelA), 'flag')
 		self.assertEqual(self.test_view.get_model_icon(ModelB), 'test')
+
+	def test_nav_menu_cache(self):
+		cache.clear()
+		site._nav_menu_cache.clear()
+		self.test_view.get_nav_menu = lambda: [
+			{'title': 'A', 'menus': [{'title': 'a', 'url': '/a', 'perm': 'view_base.view_modela'}]}]
+		nav_menu = self.test_view.get_user_nav_menu()
+		self.assertEqual(nav_menu, [{'title': 'A', 'menus': [{'title': 'a', 'url': '/a'}]}])
+		self.assertIn(self.test_view.get_nav_menu_key(), site._nav_menu_cache)
+
+		# users with the same permissions share the filtered menu
+		other_view = self.test_view_class()
+		other_view.setup(self._mocked_request('test/comm', user='other_admin'))
+		other_view.get_nav_menu = None
+		self.assertEqual(other_view.get_user_nav_menu(), nav_menu)
+
+	def test_nav_menu_key(self):
+		key = self.test_view.get_nav_menu_key()
+		self.test_view.apps_label_title = {'view_base': 'Views'}
+		self.assertNotEqual(self.test_view.get_nav_menu_key(), key)
+		self.test_view.apps_label_title = {}
+		self.test_view.hidden_model_menu = lambda model, model_admin: model is ModelC
+		self.assertIsNone(self.test_view.get_nav_menu_key())
+
+	def test_site_menu_key(self):
+		class SiteMenuView(TestCommView):
+			def get_site_menu(self):
+				return [{'title': self.user.username, 'url': '/user'}]
+
+		view = site.get_view_class(SiteMenuView)()
+		view.setup(self._mocked_request('test/comm', user=self.test_view.user))
+		# the site menu may depend on the request
+		self.assertIsNone(view.get_nav_menu_key())
+		view.shared_site_menu = True
+		self.assertIsNotNone(view.get_nav_menu_key())
+
+	@override_settings(XADMIN_PERMISSION_CACHE={'enabled': True, 'allow_local_cache': True})
+	def test_nav_menu_page(self):
+		cache.clear()
+		site._nav_menu_cache.clear()
+		user = User.objects.create(username='staff_admin', is_superuser=True, is_staff=True)
+		self.client.force_login(user)
+		for i in range(2):
+			response = self.client.get('/view_base/test/comm')
+			self.assertEqual(response.status_code, 200)
+			titles = [menu['title'] for menu in response.context['nav_menu']]
+			self.assertIn('View_Base', titles)
+			self.assertTrue(all(type(title) is str for title in titles))
+
+
+class HookView(BaseAdminView):
+
+	@filter_hook
+	def get_title(self):
+		return "title"
+
+	@filter_hook
+	def get_nothing(self):
+		return None
+
+
+class HookPluginA(BaseAdminPlugin):
+
+	def get_title(self, title):
+		return "%s A" % title
+
+
+class HookPluginB(BaseAdminPlugin):
+
+	def get_title(self, title):
+		return "%s B" % title
+
+	get_title.priority = 20
+
+
+class HookPluginLazy(BaseAdminPlugin):
+
+	def get_title(self, __):
+		return "lazy"
+
+	def get_nothing(self):
+		return "nothing"
+
+
+class HookPluginInstance(BaseAdminPlugin):
+
+	def init_request(self, *args, **kwargs):
+		# filter replaced by the plugin instance
+		self.get_title = self.get_instance_title
+
+	def get_instance_title(self, title):
+		return "%s instance" % title
+
+
+class FilterHookTest(BaseTest):
+
+	def get_view(self, *plugins):
+		hook_site = AdminSite('hooks')
+		hook_site.register_view(r"^hooks/$", HookView, 'hooks')
+		hook_site.register_plugins(HookView, *plugins)
+		view = hook_site.get_view_class(HookView)()
+		view.setup(self._mocked_request('hooks/'))
+		return view
+
+	def test_priority_order(self):
+		view = self.get_view(HookPluginA, HookPluginB)
+		# the highest priority filter receives the view result first
+		self.assertEqual(view.get_title(), "title B A")
+
+	def test_lazy_filter(self):
+		view = self.get_view(HookPluginA, HookPluginLazy)
+		self.assertEqual(view.get_title(), "lazy A")
+		self.assertEqual(view.get_nothing(), "nothing")
+
+	def test_instance_filter(self):
+		view = self.get_view(HookPluginA, HookPluginInstance)
+		self.assertEqual(view.get_title(), "title instance A")
+		self.assertNotIn('_hook_chains_cache', type(view).__dict__)
+
+	def test_compiled_chain_cache(self):
+		view = self.get_view(HookPluginA, HookPluginB)
+		view.get_title()
+		chains = get_hook_chains(view)
+		self.assertIn('get_title', chains)
+		self.assertIs(chains, type(view)._hook_chains_cache[(HookPluginA, HookPluginB)])
+
+
+class HookOptionPlugin(BaseAdminPlugin):
+	hook_option = None
+	active_options = ('hook_option',)
+
+	def get_title(self, title):
+		return "%s %s" % (title, self.hook_option)
+
+
+class HookViewOption:
+	hook_option = 'option'
+
+
+class PluginActivationTest(BaseTest):
+
+	def get_site(self):
+		hook_site = AdminSite('activation')
+		hook_site.register_view(r"^hooks/$", HookView, 'hooks')
+		hook_site.register_plugin(HookOptionPlugin, HookView)
+		return hook_site
+
+	def test_inactive_plugin_removed(self):
+		view_class = self.get_site().get_view_class(HookView)
+		self.assertEqual(view_class.plugin_classes, [])
+
+	def test_active_plugin(self):
+		view_class = self.get_site().get_view_class(HookView, HookViewOption)
+		self.assertEqual(len(view_class.plugin_classes), 1)
+		view = view_class()
+		view.setup(self._mocked_request('hooks/'))
+		self.assertEqual(view.get_title(), "title option")
+
+
+class ViewClassCacheTest(BaseTest):
+
+	def test_opts_key(self):
+		cache_site = AdminSite('view_cache')
+		view_class = cache_site.get_view_class(ListAdminView, ModelAAdmin)
+		view_class_opts = cache_site.get_view_class(ListAdminView, ModelAAdmin, list_per_page=10)
+
+		self.assertIsNot(view_class, view_class_opts)
+		self.assertEqual(view_class_opts.list_per_page, 10)
+		self.assertIs(cache_site.get_view_class(ListAdminView, ModelAAdmin), view_class)
+		self.assertIs(cache_site.get_view_class(ListAdminView, ModelAAdmin, list_per_page=10), view_class_opts)
+
+		info = cache_site.get_view_cache_info()
+		self.assertEqual(info['misses'], 2)
+		self.assertEqual(info['hits'], 2)
+		self.assertGreater(info['memory'], 0)
+
+	def test_maxsize(self):
+		cache_site = AdminSite('view_cache')
+		cache_site._admin_view_cache.maxsize = 1
+		cache_site.get_view_class(TestBaseView)
+		cache_site.get_view_class(TestAView)
+
+		info = cache_site.get_view_cache_info()
+		self.assertEqual(info['size'], 1)
+		self.assertEqual(info['evictions'], 1)
+
+	def test_freeze(self):
+		info = site.freeze(gc_freeze=False)
+
+		self.assertGreater(info['views'], 0)
+		self.assertGreater(info['templates'], 0)
+		self.assertIs(site.get_view_class(ListAdminView, site.get_registry(ModelA)),
+		              site.get_view_class(ListAdminView, site.get_registry(ModelA)))
+
+
+class LazyPluginsTest(BaseTest):
+
+	def test_manifest(self):
+		import xadmin
+		from django.utils.module_loading import import_string
+		from xadmin.plugins import LAZY_PLUGINS
+
+		for name, view_classes in LAZY_PLUGINS.items():
+			module = import_module('xadmin.plugins.%s' % name)
+			view_classes = [import_string(path) for path in view_classes]
+			for view_class, plugins in xadmin.site._registry_plugins.items():
+				for plugin_class in plugins:
+					if getattr(plugin_class, '__module__', None) == module.__name__:
+						self.assertIn(view_class, view_classes, msg=plugin_class)
+			# the list filters must be registered before the first list view is built
+			for list_filter in manager._field_list_filters:
+				self.assertNotEqual(list_filter.__module__, module.__name__, msg=list_filter)
+
+	def test_load_lazy_plugins(self):
+		site.register_plugin(HookPluginA, TestLazyView)
+		site.register_lazy_plugins('view_base.lazy_plugins', TestLazyView)
+		site.register_plugin(HookPluginB, TestLazyView)
+		self.assertNotIn('view_base.lazy_plugins', sys.modules)
+
+		view_class = site.get_view_class(TestLazyView)
+		self.assertIn('view_base.lazy_plugins', sys.modules)
+		# the plugins of the module take the place reserved on registration
+		self.assertEqual([p.__name__ for p in view_class.plugin_classes],
+		                 ['HookPluginA', 'LazyPlugin', 'HookPluginB'])
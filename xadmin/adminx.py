@@ -1,7 +1,8 @@
 from django.utils.translation import gettext_lazy as _
 
 import xadmin
-from xadmin.models import UserSettings, Log
+from xadmin.metrics import get_slow_request_config
+from xadmin.models import UserSettings, Log, SlowRequest
 
 
 class UserSettingsAdmin:
@@ -37,3 +38,33 @@ class LogAdmin:
 
 
 xadmin.site.register(Log, LogAdmin)
+
+
+class SlowRequestAdmin:
+
+	def top_hooks(self, instance):
+		return ', '.join('%(owner)s.%(name)s (%(time).0f ms)' % hook for hook in instance.hooks_json()[:3])
+
+	top_hooks.short_description = _('Top hooks')
+	top_hooks.depends_on = ('hooks',)
+
+	list_display = ('request_time', 'method', 'path', 'view', 'model', 'user', 'status', 'duration', 'queries',
+	                'top_hooks')
+	list_filter = ['request_time', 'view', 'model', 'status', 'user']
+	search_fields = ['path', 'query_string', 'view', 'model']
+	readonly_fields = ('view', 'model', 'method', 'path', 'query_string', 'user', 'status', 'duration', 'queries',
+	                   'hooks')
+	remove_permissions = ('add', 'change')
+	list_count = 'capped'
+	model_icon = 'fa fa-hourglass-half'
+	# the charts show the latest page of slow requests
+	data_charts = {
+		'duration': {'title': _('Duration (ms)'), 'x-field': 'request_time', 'y-field': ('duration',),
+		             'order': ('-request_time',)},
+		'queries': {'title': _('SQL queries'), 'x-field': 'request_time', 'y-field': ('queries',),
+		            'order': ('-request_time',)},
+	}
+
+
+if get_slow_request_config()['enabled']:
+	xadmin.site.register(SlowRequest, SlowRequestAdmin)
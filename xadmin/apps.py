@@ -13,3 +13,6 @@ class XAdminConfig(AppConfig):
 	def ready(self):
 		self.module.autodiscover()
 		setattr(xadmin, 'site', xadmin.site)
+
+		from xadmin.models import connect_permission_cache_signals
+		connect_permission_cache_signals()
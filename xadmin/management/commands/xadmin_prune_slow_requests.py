@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from xadmin.metrics import get_slow_request_config, prune_slow_requests
+
+
+class Command(BaseCommand):
+	help = ("Removes the slow requests older than the retention of XADMIN_SLOW_REQUESTS "
+	        "(run it periodically, e.g. from cron).")
+
+	def add_arguments(self, parser):
+		parser.add_argument('--days', type=int, dest='days',
+		                    help='Removes the records older than DAYS (default: the configured retention).')
+		parser.add_argument('--batch-size', type=int, default=1000, dest='batch_size',
+		                    help='Records removed by transaction.')
+
+	def handle(self, *args, **options):
+		days = options['days']
+		if days is None:
+			days = get_slow_request_config()['retention']
+		if not days:
+			raise CommandError('No retention: set XADMIN_SLOW_REQUESTS["retention"] or use --days.')
+		removed = prune_slow_requests(days, options['batch_size'])
+		self.stdout.write(self.style.SUCCESS("{removed} slow requests removed".format(removed=removed)))
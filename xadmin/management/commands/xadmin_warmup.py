@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+import xadmin
+
+
+class Command(BaseCommand):
+	help = ("Builds the merged view/plugin classes of the xadmin site and compiles its templates "
+	        "(checks the warmup done by 'site.freeze()' before the workers fork).")
+
+	def add_arguments(self, parser):
+		parser.add_argument('--no-templates', action='store_false', dest='templates',
+		                    help='Do not compile the templates.')
+		parser.add_argument('--gc-freeze', action='store_true', dest='gc_freeze',
+		                    help='Calls gc.freeze() at the end (useful only in the process that forks the workers).')
+
+	def handle(self, *args, **options):
+		info = xadmin.site.freeze(templates=options['templates'],
+		                          gc_freeze=options['gc_freeze'])
+		self.stdout.write(self.style.SUCCESS(
+			"{views} views, {plugins} plugins and {templates} templates ready in {time:.3f}s".format(**info)))
+		cache_info = xadmin.site.get_view_cache_info()
+		self.stdout.write("view class cache: {size} classes (~{memory} bytes)".format(**cache_info))
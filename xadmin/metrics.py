@@ -0,0 +1,377 @@
+"""
+In-process metrics of the admin requests, exposed in the Prometheus text format,
+and the log of the slow admin requests.
+"""
+import datetime
+import glob
+import json
+import logging
+import os
+import random
+import secrets
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections, transaction, DatabaseError
+from django.utils import timezone
+
+from xadmin.profiler import HookProfiler, current_hook_profiler
+
+try:
+	import fcntl
+except ImportError:  # the files of the stopped processes are not merged
+	fcntl = None
+
+logger = logging.getLogger('xadmin.metrics')
+
+METRICS_FILE = 'xadmin_metrics_%s.json'
+# metrics of the stopped processes
+METRICS_ARCHIVE_FILE = METRICS_FILE % 'archive'
+METRICS_LOCK_FILE = 'xadmin_metrics.lock'
+
+# name: (type, help)
+METRICS = {
+	'xadmin_requests_total': ('counter', 'Admin requests by view, model, method and status.'),
+	'xadmin_request_duration_seconds': ('histogram', 'Admin request latency by view and model.'),
+	'xadmin_request_queries': ('histogram', 'SQL queries per admin request by view and model.'),
+	'xadmin_hook_duration_seconds_total': ('counter', 'Time spent in the view and plugin hooks.'),
+	'xadmin_hook_calls_total': ('counter', 'Calls of the view and plugin hooks.'),
+	'xadmin_export_rows_total': ('counter', 'Exported rows by model and format.'),
+	'xadmin_import_rows_total': ('counter', 'Imported rows by model and format.'),
+}
+
+
+def get_metrics_config():
+	config = {
+		'enabled': False,
+		'permission': 'xadmin.view_metrics',
+		'directory': None,  # shared by the processes of one host to aggregate their metrics
+		'flush_interval': 10,  # seconds between two writes of the metrics of a process
+		'hooks': False,  # collect the time of the hooks (runs the hook profiler on every request)
+		'latency_buckets': (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+		'query_buckets': (5, 10, 25, 50, 100, 250),
+	}
+	config.update(getattr(settings, 'XADMIN_METRICS', {}))
+	return config
+
+
+def get_slow_request_config():
+	config = {
+		'enabled': False,
+		'threshold': 1000,  # ms
+		'sample': 1.0,  # fraction of the slow requests that are stored
+		'retention': 30,  # days kept by the xadmin_prune_slow_requests command (None to keep the records)
+		'hooks': 5,  # slowest hooks stored with the record (0 to not run the hook profiler)
+	}
+	config.update(getattr(settings, 'XADMIN_SLOW_REQUESTS', {}))
+	return config
+
+
+def observes_requests():
+	return get_metrics_config()['enabled'] or get_slow_request_config()['enabled']
+
+
+class Metrics:
+	"""
+	Counters and histograms by (name, labels). The labels are a tuple of
+	(label, value) pairs; histograms keep the counts of each bucket, the sum
+	and the count of the observed values.
+	"""
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.counters = {}
+		self.histograms = {}
+		self.flushed = 0
+		self.file_pid = self.file_name = None
+
+	def inc(self, name, labels, value=1):
+		key = (name, labels)
+		with self.lock:
+			self.counters[key] = self.counters.get(key, 0) + value
+
+	def observe(self, name, labels, value, buckets):
+		key = (name, labels)
+		with self.lock:
+			histogram = self.histograms.get(key)
+			if histogram is None:
+				histogram = self.histograms[key] = [list(buckets), [0] * len(buckets), 0, 0]
+			for i, bound in enumerate(histogram[0]):
+				if value <= bound:
+					histogram[1][i] += 1
+					break
+			histogram[2] += value
+			histogram[3] += 1
+
+	def dump(self):
+		with self.lock:
+			return {
+				'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+				'histograms': [[name, labels, buckets, list(counts), total, count]
+				               for (name, labels), (buckets, counts, total, count) in self.histograms.items()],
+			}
+
+	def load(self, data):
+		"""Adds the dumped metrics of another process"""
+		for name, labels, value in data['counters']:
+			self.inc(name, tuple(map(tuple, labels)), value)
+		with self.lock:
+			for name, labels, buckets, counts, total, count in data['histograms']:
+				key = (name, tuple(map(tuple, labels)))
+				histogram = self.histograms.get(key)
+				if histogram is None or histogram[0] != buckets:
+					histogram = self.histograms[key] = [buckets, [0] * len(buckets), 0, 0]
+				histogram[1] = [a + b for a, b in zip(histogram[1], counts)]
+				histogram[2] += total
+				histogram[3] += count
+
+	def flush(self, directory):
+		"""
+		Writes the metrics of this process in the shared directory. The file is named
+		after the pid and a random token, so a process reusing the pid of a stopped one
+		does not replace its metrics.
+		"""
+		if self.file_pid != os.getpid():
+			self.file_pid = os.getpid()
+			self.file_name = METRICS_FILE % ('%d_%s' % (self.file_pid, secrets.token_hex(4)))
+		write_metrics_file(os.path.join(directory, self.file_name), self.dump())
+		self.flushed = time.monotonic()
+
+	def render(self):
+		"""Metrics in the Prometheus text exposition format"""
+		samples = {}
+		with self.lock:
+			for (name, labels), value in self.counters.items():
+				samples.setdefault(name, []).append((name, labels, value))
+			for (name, labels), (buckets, counts, total, count) in self.histograms.items():
+				lines = samples.setdefault(name, [])
+				cumulative = 0
+				for bound, bucket_count in zip(buckets, counts):
+					cumulative += bucket_count
+					lines.append(('%s_bucket' % name, labels + (('le', format_value(bound)),), cumulative))
+				lines.append(('%s_bucket' % name, labels + (('le', '+Inf'),), count))
+				lines.append(('%s_sum' % name, labels, total))
+				lines.append(('%s_count' % name, labels, count))
+		output = []
+		for name in sorted(samples):
+			metric_type, help_text = METRICS.get(name, ('untyped', name))
+			output.append('# HELP %s %s' % (name, help_text))
+			output.append('# TYPE %s %s' % (name, metric_type))
+			for sample, labels, value in samples[name]:
+				output.append('%s%s %s' % (sample, format_labels(labels), format_value(value)))
+		return '\n'.join(output) + '\n'
+
+
+def format_labels(labels):
+	if not labels:
+		return ''
+	return '{%s}' % ','.join('%s="%s"' % (label, str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"'))
+	                         for label, value in labels)
+
+
+def format_value(value):
+	return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# metrics of this process
+metrics = Metrics()
+
+
+def write_metrics_file(path, data):
+	directory = os.path.dirname(path)
+	os.makedirs(directory, exist_ok=True)
+	fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+	with os.fdopen(fd, 'w') as fp:
+		json.dump(data, fp)
+	os.replace(tmp_path, path)
+
+
+def read_metrics_file(path):
+	try:
+		with open(path) as fp:
+			return json.load(fp)
+	except (OSError, ValueError):
+		# removed by another process
+		return None
+
+
+def get_file_pid(path):
+	"""Pid of the process of a metrics file (None for the archive)"""
+	name = os.path.splitext(os.path.basename(path))[0][len(METRICS_FILE.split('%s')[0]):]
+	pid = name.split('_', 1)[0]
+	return int(pid) if pid.isdigit() else None
+
+
+def is_process_running(pid):
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except PermissionError:
+		pass
+	return True
+
+
+def merge_stopped_processes(directory, paths):
+	"""
+	Moves the metrics of the stopped processes to the archive file, so their counters
+	are kept and the directory does not grow with the restarts of the server.
+	The caller holds the lock of the directory.
+	"""
+	stopped = [path for path in paths if (pid := get_file_pid(path)) is not None and not is_process_running(pid)]
+	if not stopped:
+		return paths
+	archive_path = os.path.join(directory, METRICS_ARCHIVE_FILE)
+	archive = Metrics()
+	for path in [archive_path] + stopped:
+		data = read_metrics_file(path)
+		if data is not None:
+			archive.load(data)
+	write_metrics_file(archive_path, archive.dump())
+	for path in stopped:
+		os.remove(path)
+	return [path for path in paths if path not in stopped and path != archive_path] + [archive_path]
+
+
+def get_aggregated_metrics(config):
+	"""Metrics of all the processes sharing the metrics directory (or of this process)"""
+	if not config['directory']:
+		return metrics
+	directory = config['directory']
+	metrics.flush(directory)
+	aggregated = Metrics()
+	with ExitStack() as stack:
+		if fcntl is not None:
+			lock = stack.enter_context(open(os.path.join(directory, METRICS_LOCK_FILE), 'w'))
+			fcntl.flock(lock, fcntl.LOCK_EX)
+		paths = glob.glob(os.path.join(directory, METRICS_FILE % '*'))
+		if fcntl is not None:
+			paths = merge_stopped_processes(directory, paths)
+		for path in paths:
+			data = read_metrics_file(path)
+			if data is not None:
+				aggregated.load(data)
+	return aggregated
+
+
+def get_view_labels(view):
+	"""(view, model) labels of an admin view function"""
+	view_class = getattr(view, 'view_class', None)
+	if view_class is None:
+		return ('view', getattr(view, '__name__', type(view).__name__)), ('model', '')
+	name = getattr(view_class, 'admin_view_class', view_class).__name__
+	model = getattr(view_class, 'model', None)
+	return ('view', name), ('model', model._meta.label_lower if model is not None else '')
+
+
+class QueryCounter:
+
+	def __init__(self):
+		self.count = 0
+
+	def __call__(self, execute, sql, params, many, context):
+		self.count += 1
+		return execute(sql, params, many, context)
+
+
+def observe_request(labels, view, request, *args, **kwargs):
+	"""
+	Runs the view, records its latency, queries and hook times and logs it if it is slow.
+	Template responses are recorded once rendered by the request handler (after the
+	template response middleware): their latency includes the render, but the queries
+	and the hooks of the render are not counted. Views raising an exception are recorded
+	with the status 500.
+	"""
+	config = get_metrics_config()
+	slow_config = get_slow_request_config()
+	hooks = (config['enabled'] and config['hooks']) or (slow_config['enabled'] and slow_config['hooks'])
+	counter = QueryCounter()
+	profiler = current_hook_profiler.get()
+	token = None
+	if profiler is None and hooks:
+		profiler = HookProfiler()
+		token = current_hook_profiler.set(profiler)
+	start = time.perf_counter()
+
+	def record(status):
+		record_request(config, slow_config, labels, request, status, time.perf_counter() - start, counter.count,
+		               profiler)
+
+	try:
+		with ExitStack() as stack:
+			for connection in connections.all():
+				stack.enter_context(connection.execute_wrapper(counter))
+			response = view(request, *args, **kwargs)
+	except Exception:
+		record(500)
+		raise
+	finally:
+		if token is not None:
+			current_hook_profiler.reset(token)
+	if callable(getattr(response, 'add_post_render_callback', None)) and not response.is_rendered:
+		def record_rendered(rendered):
+			record(rendered.status_code)
+		response.add_post_render_callback(record_rendered)
+	else:
+		record(response.status_code)
+	return response
+
+
+def record_request(config, slow_config, labels, request, status, duration, queries, profiler):
+	if config['enabled']:
+		metrics.inc('xadmin_requests_total', labels + (('method', request.method), ('status', status)))
+		metrics.observe('xadmin_request_duration_seconds', labels, duration, config['latency_buckets'])
+		metrics.observe('xadmin_request_queries', labels, queries, config['query_buckets'])
+		if profiler is not None and config['hooks']:
+			for (owner, name), (hook_duration, calls) in list(profiler.timings.items()):
+				hook_labels = (('owner', owner), ('hook', name))
+				metrics.inc('xadmin_hook_duration_seconds_total', hook_labels, hook_duration)
+				metrics.inc('xadmin_hook_calls_total', hook_labels, calls)
+		if config['directory'] and time.monotonic() - metrics.flushed > config['flush_interval']:
+			metrics.flush(config['directory'])
+	if slow_config['enabled'] and duration * 1000 >= slow_config['threshold'] \
+			and random.random() < slow_config['sample']:
+		hook_records = profiler.get_records(slow_config['hooks']) if profiler is not None and slow_config['hooks'] else []
+		log_slow_request(slow_config, dict(labels), request, status, duration, queries, hook_records)
+
+
+def log_slow_request(config, labels, request, status, duration, queries, hooks):
+	from xadmin.models import SlowRequest
+
+	user = getattr(request, 'user', None)
+	record = SlowRequest(
+		view=labels['view'][:128], model=labels['model'], method=request.method, path=request.path[:255],
+		query_string=request.META.get('QUERY_STRING', ''), user=user if getattr(user, 'pk', None) else None,
+		status=status, duration=round(duration * 1000, 3), queries=queries,
+	)
+	record.set_hooks(hooks)
+	try:
+		with transaction.atomic(using=SlowRequest.objects.db):
+			record.save()
+	except DatabaseError:
+		logger.exception('The slow request %s %s could not be logged', request.method, request.path)
+
+
+def prune_slow_requests(days, batch_size=1000):
+	"""
+	Removes the slow requests older than days, batch_size records at a time (each
+	batch is a short transaction). Returns the number of removed records.
+	"""
+	from xadmin.models import SlowRequest
+
+	expired = SlowRequest.objects.filter(request_time__lt=timezone.now() - datetime.timedelta(days=days))
+	removed = 0
+	while True:
+		pks = list(expired.order_by().values_list('pk', flat=True)[:batch_size])
+		if not pks:
+			return removed
+		removed += SlowRequest.objects.filter(pk__in=pks).delete()[0]
+
+
+def count_rows(kind, model, file_format, rows):
+	"""Counts the exported or imported (kind) rows of a model"""
+	if rows and get_metrics_config()['enabled']:
+		metrics.inc('xadmin_%s_rows_total' % kind, (('model', model._meta.label_lower), ('format', file_format)), rows)
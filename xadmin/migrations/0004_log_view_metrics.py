@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+	dependencies = [
+		('xadmin', '0003_auto_20160715_0100'),
+	]
+
+	operations = [
+		migrations.AlterModelOptions(
+			name='log',
+			options={'ordering': ('-action_time',), 'permissions': (('view_metrics', 'Can view the admin metrics'),),
+			         'verbose_name': 'log entry', 'verbose_name_plural': 'log entries'},
+		),
+	]
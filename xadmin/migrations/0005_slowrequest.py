@@ -0,0 +1,38 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+	dependencies = [
+		migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+		('xadmin', '0004_log_view_metrics'),
+	]
+
+	operations = [
+		migrations.CreateModel(
+			name='SlowRequest',
+			fields=[
+				('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+				('request_time', models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False,
+				                                      verbose_name='request time')),
+				('view', models.CharField(max_length=128, verbose_name='view')),
+				('model', models.CharField(blank=True, max_length=128, verbose_name='model')),
+				('method', models.CharField(max_length=10, verbose_name='method')),
+				('path', models.CharField(max_length=255, verbose_name='path')),
+				('query_string', models.TextField(blank=True, verbose_name='query string')),
+				('status', models.PositiveSmallIntegerField(verbose_name='status')),
+				('duration', models.FloatField(verbose_name='duration (ms)')),
+				('queries', models.PositiveIntegerField(verbose_name='SQL queries')),
+				('hooks', models.TextField(blank=True, verbose_name='top hooks')),
+				('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL,
+				                           to=settings.AUTH_USER_MODEL, verbose_name='user')),
+			],
+			options={
+				'verbose_name': 'slow request',
+				'verbose_name_plural': 'slow requests',
+				'ordering': ('-request_time',),
+			},
+		),
+	]
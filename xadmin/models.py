@@ -1,14 +1,21 @@
 import datetime
 import decimal
 import json
+import uuid
+import warnings
 
 from django.conf import settings
-from django.contrib.auth.models import Permission
+from django.contrib import auth
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Group, Permission, PermissionsMixin
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.db.models.base import ModelBase
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_migrate, m2m_changed, post_save, post_delete
 from django.urls.base import reverse
 from django.utils import timezone
 from django.utils.functional import classproperty
@@ -40,6 +47,189 @@ def add_view_permissions(sender, **kwargs):
 # check for all our view permissions after a syncdb
 post_migrate.connect(add_view_permissions)
 
+PERMISSION_CACHE_KEY = 'xadmin_perms_%s_%s_%s'
+PERMISSION_VERSION_KEY = 'xadmin_perms_version'
+PERMISSION_USER_VERSION_KEY = 'xadmin_perms_version_%s'
+
+
+def get_permission_cache_config():
+	config = {
+		'enabled': False,
+		'cache': DEFAULT_CACHE_ALIAS,
+		'timeout': 3600,
+		# a cache local to the process keeps revoked permissions in the other processes
+		'allow_local_cache': False,
+	}
+	config.update(getattr(settings, 'XADMIN_PERMISSION_CACHE', {}))
+	return config
+
+
+LOCAL_CACHE_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared_cache(alias):
+	"""The cache is shared by the processes of the server (not a local memory or dummy cache)"""
+	return not isinstance(caches[alias], LOCAL_CACHE_BACKENDS)
+
+
+def get_cache_versions(cache, keys):
+	"""
+	Current versions of the keys. A missing version (never set or evicted) gets a new
+	random value, so the entries stored with a previous version can not be served again.
+	"""
+	versions = cache.get_many(keys)
+	for key in keys:
+		if key not in versions:
+			cache.add(key, uuid.uuid4().hex, None)
+			versions[key] = cache.get(key)
+	return versions
+
+
+def bump_cache_versions(cache, keys):
+	cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+
+def is_permission_cache_enabled(config):
+	if not config['enabled']:
+		return False
+	if not config['allow_local_cache'] and not is_shared_cache(config['cache']):
+		warnings.warn('XADMIN_PERMISSION_CACHE is disabled: the "%s" cache is not shared by the processes '
+		              '(set allow_local_cache to use it anyway)' % config['cache'], RuntimeWarning)
+		return False
+	return True
+
+
+def is_permission_cacheable(user):
+	"""
+	The permission set can be cached when it only depends on the model permissions
+	(default user 'has_perm' and backends validating through 'get_all_permissions').
+	"""
+	if not user.is_active or user.is_superuser or user.pk is None:
+		return False
+	if getattr(type(user), 'has_perm', None) is not PermissionsMixin.has_perm:
+		return False
+	for backend in auth.get_backends():
+		method = getattr(type(backend), 'has_perm', None)
+		if method is not None and method is not ModelBackend.has_perm:
+			return False
+	return True
+
+
+def get_cached_permissions(user):
+	"""Set of the permission names of the user (shared between requests and processes)"""
+	config = get_permission_cache_config()
+	if not is_permission_cache_enabled(config) or not is_permission_cacheable(user):
+		return None
+	cache = caches[config['cache']]
+	user_version_key = PERMISSION_USER_VERSION_KEY % user.pk
+	versions = get_cache_versions(cache, [PERMISSION_VERSION_KEY, user_version_key])
+	key = PERMISSION_CACHE_KEY % (user.pk, versions[PERMISSION_VERSION_KEY], versions[user_version_key])
+	perms = cache.get(key)
+	if perms is None:
+		perms = frozenset(user.get_all_permissions())
+		cache.set(key, perms, config['timeout'])
+	return perms
+
+
+def invalidate_cached_permissions(user_pks=None):
+	"""Invalidates the cached permissions of the users (all users if 'user_pks' is None)"""
+	config = get_permission_cache_config()
+	if not is_permission_cache_enabled(config):
+		return
+	cache = caches[config['cache']]
+	keys = [PERMISSION_VERSION_KEY] if user_pks is None else [PERMISSION_USER_VERSION_KEY % pk for pk in user_pks]
+	bump_cache_versions(cache, keys)
+
+
+def permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+	if action not in ('post_add', 'post_remove', 'post_clear'):
+		return
+	if sender is Group.permissions.through:
+		invalidate_cached_permissions()
+	elif not reverse:
+		invalidate_cached_permissions([instance.pk])
+	else:
+		# the users of the relation are in 'pk_set' (None when the relation is cleared)
+		invalidate_cached_permissions(pk_set)
+
+
+def permission_model_changed(sender, **kwargs):
+	invalidate_cached_permissions()
+
+
+def connect_permission_cache_signals():
+	user_model = auth.get_user_model()
+	senders = [Group.permissions.through]
+	if issubclass(user_model, PermissionsMixin):
+		senders += [user_model.user_permissions.through, user_model.groups.through]
+	for sender in senders:
+		m2m_changed.connect(permissions_changed, sender=sender, dispatch_uid='xadmin_perms_%s' % sender._meta.label)
+	for sender in (Permission, Group):
+		post_save.connect(permission_model_changed, sender=sender, dispatch_uid='xadmin_perms_save_%s' % sender._meta.label)
+		post_delete.connect(permission_model_changed, sender=sender, dispatch_uid='xadmin_perms_delete_%s' % sender._meta.label)
+
+
+COUNT_CACHE_KEY = 'xadmin_count_%s'
+DATA_VERSION_KEY = 'xadmin_data_version_%s'
+
+
+def get_count_cache_config():
+	config = {'enabled': False, 'cache': DEFAULT_CACHE_ALIAS, 'timeout': 300}
+	config.update(getattr(settings, 'XADMIN_COUNT_CACHE', {}))
+	return config
+
+
+def uses_count_cache(admin):
+	"""True when the admin (class or view) caches its counts (``list_count_cache``)"""
+	return bool(get_count_cache_config()['enabled'] and getattr(admin, 'list_count_cache', False))
+
+
+def get_data_versions(tables):
+	"""Data versions of the database tables, changed whenever their rows change"""
+	config = get_count_cache_config()
+	keys = [DATA_VERSION_KEY % table for table in sorted(set(tables))]
+	versions = get_cache_versions(caches[config['cache']], keys)
+	return [versions[key] for key in keys]
+
+
+def bump_data_version(*models):
+	"""Invalidates the cached counts of queries using the tables of the models"""
+	config = get_count_cache_config()
+	if not config['enabled']:
+		return
+	cache = caches[config['cache']]
+	tables = set()
+	for model in models:
+		opts = model._meta
+		tables.add(opts.db_table)
+		tables.update(parent._meta.db_table for parent in opts.get_parent_list())
+	bump_cache_versions(cache, [DATA_VERSION_KEY % table for table in tables])
+
+
+def data_changed(sender, **kwargs):
+	bump_data_version(sender)
+
+
+def m2m_data_changed(sender, instance, action, model, **kwargs):
+	if action in ('post_add', 'post_remove', 'post_clear'):
+		bump_data_version(sender, type(instance), model)
+
+
+def connect_data_version_signals(models):
+	"""
+	Connects the data version signals of the models (admin models caching their counts).
+	Receivers are connected per model so the other models keep their fast deletes.
+	"""
+	for model in models:
+		label = model._meta.label
+		post_save.connect(data_changed, sender=model, dispatch_uid='xadmin_data_save_%s' % label)
+		post_delete.connect(data_changed, sender=model, dispatch_uid='xadmin_data_delete_%s' % label)
+		for field in model._meta.local_many_to_many:
+			through = field.remote_field.through
+			if not isinstance(through, str):
+				m2m_changed.connect(m2m_data_changed, sender=through,
+				                    dispatch_uid='xadmin_data_m2m_%s' % through._meta.label)
+
 
 class Bookmark(models.Model):
 	title = models.CharField(_('Title'), max_length=128)
@@ -163,6 +353,7 @@ class Log(models.Model):
 		verbose_name = _('log entry')
 		verbose_name_plural = _('log entries')
 		ordering = ('-action_time',)
+		permissions = (('view_metrics', _('Can view the admin metrics')),)
 
 	@classproperty
 	def object_repr_length(cls):
@@ -188,3 +379,33 @@ class Log(models.Model):
 	def get_edited_object(self):
 		"""Returns the edited object represented by this log entry"""
 		return self.content_type.get_object_for_this_type(pk=self.object_id)
+
+
+class SlowRequest(models.Model):
+	"""Admin request slower than the threshold of ``XADMIN_SLOW_REQUESTS``"""
+	request_time = models.DateTimeField(_('request time'), default=timezone.now, editable=False, db_index=True)
+	view = models.CharField(_('view'), max_length=128)
+	model = models.CharField(_('model'), max_length=128, blank=True)
+	method = models.CharField(_('method'), max_length=10)
+	path = models.CharField(_('path'), max_length=255)
+	query_string = models.TextField(_('query string'), blank=True)
+	user = models.ForeignKey(AUTH_USER_MODEL, models.SET_NULL, verbose_name=_('user'), blank=True, null=True)
+	status = models.PositiveSmallIntegerField(_('status'))
+	duration = models.FloatField(_('duration (ms)'))
+	queries = models.PositiveIntegerField(_('SQL queries'))
+	hooks = models.TextField(_('top hooks'), blank=True)
+
+	class Meta:
+		verbose_name = _('slow request')
+		verbose_name_plural = _('slow requests')
+		ordering = ('-request_time',)
+
+	def hooks_json(self):
+		"""[{'owner', 'name', 'time' (ms), 'calls'}] of the slowest hooks"""
+		return json.loads(self.hooks) if self.hooks else []
+
+	def set_hooks(self, records):
+		self.hooks = json.dumps(records)
+
+	def __str__(self):
+		return '%s %s (%.0f ms)' % (self.method, self.path, self.duration)
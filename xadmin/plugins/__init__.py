@@ -32,11 +32,51 @@ PLUGINS = (
 )
 
 
+_LIST = 'xadmin.views.ListAdminView'
+_FORM = 'xadmin.views.ModelFormAdminView'
+_DETAIL = 'xadmin.views.DetailAdminView'
+
+# Plugin modules that only register plugins, with the view classes they are registered.
+# These modules are imported only when a merged view of one of the classes is built
+# (the others also register views, models or list filters, so they are imported on autodiscover).
+LAZY_PLUGINS = {
+	'actions': (_LIST,),
+	'filters': (_LIST,),
+	'export': (_LIST,),
+	'layout': (_LIST,),
+	'refresh': (_LIST,),
+	'details': (_LIST,),
+	'relate': (_LIST, 'xadmin.views.CreateAdminView', 'xadmin.views.UpdateAdminView',
+	           'xadmin.views.DeleteAdminView'),
+	'ajax': (_LIST, _FORM, _DETAIL),
+	'relfield': (_FORM,),
+	'inline': (_FORM, _DETAIL),
+	'topnav': ('xadmin.views.CommAdminView',),
+	'portal': (_FORM, _DETAIL),
+	'quickform': (_FORM,),
+	'wizard': (_FORM,),
+	'images': (_LIST, _FORM, _DETAIL),
+	'multiselect': (_FORM,),
+	'themes': ('xadmin.views.BaseAdminView',),
+	'aggregation': (_LIST,),
+	'mobile': ('xadmin.views.CommAdminView',),
+	'sitemenu': ('xadmin.views.CommAdminView',),
+}
+
+
 def register_builtin_plugins(site):
 	from importlib import import_module
 	from django.conf import settings
 
 	plugins = PLUGINS + tuple(getattr(settings, 'XADMIN_INCLUDE_PLUGINS', ()))
 	exclude_plugins = getattr(settings, 'XADMIN_EXCLUDE_PLUGINS', [])
+	lazy_plugins = getattr(settings, 'XADMIN_LAZY_PLUGINS', True)
 
-	[import_module('xadmin.plugins.%s' % plugin) for plugin in plugins if plugin not in exclude_plugins]
+	for plugin in plugins:
+		if plugin in exclude_plugins:
+			continue
+		module = 'xadmin.plugins.%s' % plugin
+		if lazy_plugins and plugin in LAZY_PLUGINS:
+			site.register_lazy_plugins(module, *LAZY_PLUGINS[plugin])
+		else:
+			import_module(module)
@@ -10,6 +10,7 @@ from django.utils.safestring import mark_safe
 from django.utils.text import capfirst
 from django.utils.translation import gettext as _, ngettext
 
+from xadmin.models import bump_data_version, uses_count_cache
 from xadmin.plugins.utils import get_context_dict
 from xadmin.sites import site
 from xadmin.util import get_deleted_objects
@@ -30,6 +31,7 @@ action_checkbox.short_description = mark_safe(
 action_checkbox.allow_tags = True
 action_checkbox.allow_export = False
 action_checkbox.is_column = False
+action_checkbox.depends_on = ()
 
 
 class BaseActionView(ModelAdminView):
@@ -225,12 +227,17 @@ class ActionPlugin(BaseAdminPlugin):
 		return response
 
 	def response_action(self, ac, queryset):
-		if isinstance(ac, type) and issubclass(ac, BaseActionView):
-			action_view = self.get_model_view(ac, self.admin_view.model)
-			action_view.init_action(self.admin_view)
-			return action_view.do_action(queryset)
-		else:
-			return ac(self.admin_view, self.request, queryset)
+		try:
+			if isinstance(ac, type) and issubclass(ac, BaseActionView):
+				action_view = self.get_model_view(ac, self.admin_view.model)
+				action_view.init_action(self.admin_view)
+				return action_view.do_action(queryset)
+			else:
+				return ac(self.admin_view, self.request, queryset)
+		finally:
+			# bulk actions may change rows without sending model signals
+			if uses_count_cache(self.admin_view):
+				bump_data_version(self.admin_view.model)
 
 	def get_actions(self):
 		if self.actions is None:
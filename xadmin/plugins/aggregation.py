@@ -19,9 +19,7 @@ AGGREGATE_TITLE = {
 
 class AggregationPlugin(BaseAdminPlugin):
 	aggregate_fields = {}
-
-	def init_request(self, *args, **kwargs):
-		return bool(self.aggregate_fields)
+	active_options = ('aggregate_fields',)
 
 	def _get_field_aggregate(self, field_name, obj, row):
 		item = ResultItem(field_name, row)
@@ -36,9 +36,13 @@ class AjaxListPlugin(BaseAjaxPlugin):
 		                 enumerate(filter(lambda c: c.field_name in base_fields, r.cells))])
 		           for r in av.results()]
 
-		return self.render_response(
-			{'headers': headers, 'objects': objects, 'total_count': av.result_count,
-			 'has_more': av.has_more, 'page_num': av.page_num})
+		result = {'headers': headers, 'objects': objects, 'total_count': av.result_count,
+		          'total_count_exact': av.result_count_exact,
+		          'has_more': av.has_more, 'page_num': av.page_num}
+		if av.keyset:
+			# infinite scroll: the next request sends the cursor in the '_cursor' parameter
+			result['next_cursor'] = av.next_cursor
+		return self.render_response(result)
 
 
 class JsonErrorDict(ErrorDict):
@@ -120,8 +120,8 @@ class BookmarkPlugin(BaseAdminPlugin):
 			'bk_has_selected': has_selected,
 			'bk_list_base_url': list_base_url,
 			'bk_post_url': post_url,
-			'has_add_permission_bookmark': self.admin_view.request.user.has_perm('xadmin.add_bookmark'),
-			'has_change_permission_bookmark': self.admin_view.request.user.has_perm('xadmin.change_bookmark')
+			'has_add_permission_bookmark': self.permission_resolver.has_perm('xadmin.add_bookmark'),
+			'has_change_permission_bookmark': self.permission_resolver.has_perm('xadmin.change_bookmark')
 		}
 		context.update(new_context)
 		return context
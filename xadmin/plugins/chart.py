@@ -81,9 +81,7 @@ class JSONEncoder(DjangoJSONEncoder):
 
 class ChartsPlugin(BaseAdminPlugin):
 	data_charts = {}
-
-	def init_request(self, *args, **kwargs):
-		return bool(self.data_charts)
+	active_options = ('data_charts',)
 
 	def get_chart_url(self, name, v):
 		return self.admin_view.model_admin_url('chart', name) + self.admin_view.get_query_string()
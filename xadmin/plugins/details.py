@@ -1,28 +1,67 @@
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
 from django.db import models
+from django.http import Http404
 from django.urls.base import NoReverseMatch
 from django.utils.html import escape
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext as _
 
 from xadmin.sites import site
-from xadmin.views import BaseAdminPlugin, ListAdminView, DetailAdminView, UpdateAdminView
+from xadmin.views import BaseAdminPlugin, ListAdminView, ModelAdminView, DetailAdminView, UpdateAdminView
 
 
 class DetailsPlugin(BaseAdminPlugin):
 	show_detail_fields = []
 	show_all_rel_details = True
+	active_options = ('show_all_rel_details', 'show_detail_fields')
+
+	def init_request(self, *args, **kwargs):
+		self.rel_perms = {}
+
+	def get_rel_obj(self, field, obj, field_name):
+		if hasattr(field, 'remote_field') and isinstance(field.remote_field, models.ManyToOneRel):
+			return getattr(obj, field_name)
+		elif field_name in self.show_detail_fields:
+			return obj
+
+	def results(self, __):
+		"""Validates the permissions of the related objects of the page in bulk"""
+		fields = {}
+		for field_name in self.admin_view.list_display:
+			if self.show_all_rel_details or field_name in self.show_detail_fields:
+				try:
+					fields[field_name] = self.opts.get_field(field_name)
+				except FieldDoesNotExist:
+					fields[field_name] = None
+		rel_objs = {}
+		for obj in self.admin_view.result_list:
+			for field_name, field in fields.items():
+				rel_obj = self.get_rel_obj(field, obj, field_name)
+				if rel_obj:
+					rel_objs.setdefault(type(rel_obj), {})[rel_obj.pk] = rel_obj
+		for rel_model, objs in rel_objs.items():
+			if site.get_registry(rel_model, None) is None:
+				continue
+			objs = list(objs.values())
+			try:
+				view = self.get_permission_view(ModelAdminView, rel_model, args=(), kwargs={})
+				perms = zip(view.has_view_permission_bulk(objs), view.has_change_permission_bulk(objs))
+				for rel_obj, perm in zip(objs, perms):
+					self.rel_perms[(rel_model, rel_obj.pk)] = perm
+			except (PermissionDenied, Http404):
+				# the view of the related model rejects the request: validated object by object in result_item
+				continue
+		return __()
 
 	def result_item(self, item, obj, field_name, row):
 		if self.show_all_rel_details or field_name in self.show_detail_fields:
-			rel_obj = None
-			if hasattr(item.field, 'remote_field') and isinstance(item.field.remote_field, models.ManyToOneRel):
-				rel_obj = getattr(obj, field_name)
-			elif field_name in self.show_detail_fields:
-				rel_obj = obj
+			rel_obj = self.get_rel_obj(item.field, obj, field_name)
 
 			if rel_obj:
 				rel_model = type(rel_obj)
-				if model_admin := site.get_registry(rel_model, None):
+				if perms := self.rel_perms.get((rel_model, rel_obj.pk)):
+					has_view_perm, has_change_perm = perms
+				elif model_admin := site.get_registry(rel_model, None):
 					try:
 						has_view_perm = self.get_view(DetailAdminView, model_admin, rel_obj.pk).has_view_permission(rel_obj)
 						has_change_perm = self.get_view(UpdateAdminView, model_admin, rel_obj.pk).has_change_permission(rel_obj)
@@ -21,13 +21,14 @@ from xadmin.views.list import EMPTY_CHANGELIST_VALUE
 
 class EditablePlugin(BaseAdminPlugin):
 	list_editable = []
+	active_options = ('list_editable',)
 
 	def __init__(self, admin_view):
 		super(EditablePlugin, self).__init__(admin_view)
 		self.editable_need_fields = {}
 
 	def init_request(self, *args, **kwargs):
-		active = bool(self.request.method == 'GET' and self.admin_view.has_change_permission() and self.list_editable)
+		active = bool(self.request.method == 'GET' and self.admin_view.has_change_permission())
 		if active:
 			self.model_form = self.get_model_view(ModelFormAdminUtil, self.model).form_obj
 		return active
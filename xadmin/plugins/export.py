@@ -18,6 +18,7 @@ from django.utils.html import escape
 from django.utils.translation import gettext as _
 from django.utils.xmlutils import SimplerXMLGenerator
 
+from xadmin.metrics import count_rows
 from xadmin.plugins.utils import get_context_dict
 from xadmin.sites import site
 from xadmin.util import json
@@ -51,6 +52,7 @@ class ExportMenuPlugin(BaseAdminPlugin):
 	export_names = {'xlsx': 'Excel 2007', 'xls': 'Excel', 'csv': 'CSV',
 	                'xml': 'XML', 'json': 'JSON'}
 	export_to_email = True
+	active_options = ('list_export',)
 
 	def init_request(self, *args, **kwargs):
 		self.list_export = [
@@ -291,6 +293,7 @@ class ExportPlugin(BaseAdminPlugin):
 	def _get_file_spec(self, data, context):
 		file_type = data.get('export_type', 'csv')
 		content = getattr(self, 'get_%s_export' % file_type)(context)
+		count_rows('export', self.model, file_type, len(context['results']))
 		filename = "{0:s}.{1:s}".format(self.opts.verbose_name.replace(' ', '_'),
 		                                file_type)
 		file_mimetype = self.export_mimes[file_type]
@@ -107,9 +107,7 @@ class ModelDetailPlugin(BaseAdminPlugin):
 
 class ModelListPlugin(BaseAdminPlugin):
 	list_gallery = False
-
-	def init_request(self, *args, **kwargs):
-		return bool(self.list_gallery)
+	active_options = ('list_gallery',)
 
 	# Media
 	def get_media(self, media):
@@ -60,6 +60,7 @@ from import_export.resources import modelresource_factory
 from import_export.results import RowResult
 from import_export.signals import post_export, post_import
 from import_export.tmp_storages import TempFolderStorage
+from xadmin.metrics import count_rows
 from xadmin.plugins.utils import get_context_dict
 from xadmin.sites import site
 from xadmin.views import BaseAdminPlugin, ListAdminView, ModelAdminView
@@ -72,8 +73,9 @@ SKIP_ADMIN_LOG = getattr(settings, 'IMPORT_EXPORT_SKIP_ADMIN_LOG', False)
 class ImportMenuPlugin(BaseAdminPlugin):
 	import_export_args = {}
 
-	def init_request(self, *args, **kwargs):
-		return bool(self.import_export_args.get('import_resource_class'))
+	@classmethod
+	def is_active(cls, admin_view_class):
+		return bool(cls.import_export_args.get('import_resource_class'))
 
 	def block_top_toolbar(self, context, nodes):
 		has_change_perm = self.has_model_perm(self.model, 'change')
@@ -302,6 +304,10 @@ class ImportProcessView(ImportBaseView):
 							action_flag=logentry_map[row.import_type],
 							change_message="%s through import_export" % row.import_type,
 						)
+			count_rows('import', self.model, input_format.get_title(),
+			           sum(result.totals[import_type] for import_type in (RowResult.IMPORT_TYPE_NEW,
+			                                                              RowResult.IMPORT_TYPE_UPDATE,
+			                                                              RowResult.IMPORT_TYPE_DELETE)))
 			success_message = str(_('Import finished')) + ' , ' + str(_('Add')) + ' : %d' % result.totals[
 				RowResult.IMPORT_TYPE_NEW] + ' , ' + str(_('Update')) + ' : %d' % result.totals[
 				                  RowResult.IMPORT_TYPE_UPDATE]
@@ -407,6 +413,7 @@ class ExportMixin:
 		resource_class = self.get_export_resource_class()
 		data = resource_class(**self.get_export_resource_kwargs(request)).export(queryset, *args, **kwargs)
 		export_data = file_format.export_data(data)
+		count_rows('export', self.model, file_format.get_title(), len(data))
 		return export_data
 
 
@@ -417,8 +424,9 @@ class ExportMenuPlugin(ExportMixin, BaseAdminPlugin):
 	def get_media(self, media):
 		return media + self.vendor('xadmin.plugin.importexport.css', 'xadmin.plugin.importexport.js')
 
-	def init_request(self, *args, **kwargs):
-		return bool(self.import_export_args.get('export_resource_class'))
+	@classmethod
+	def is_active(cls, admin_view_class):
+		return bool(cls.import_export_args.get('export_resource_class'))
 
 	@staticmethod
 	def _form_bootstrap_styles(form):
@@ -364,7 +364,7 @@ class InlineModelAdmin(ModelFormAdminView):
 			return self.has_change_permission()
 
 		codename = get_permission_codename('add', self.opts)
-		return self.user.has_perm("%s.%s" % (self.opts.app_label, codename))
+		return self.user_has_perm(self.user, "%s.%s" % (self.opts.app_label, codename))
 
 	def has_change_permission(self, **kwargs):
 		opts = self.opts
@@ -375,14 +375,14 @@ class InlineModelAdmin(ModelFormAdminView):
 					break
 
 		codename = get_permission_codename('change', opts)
-		return self.user.has_perm("%s.%s" % (opts.app_label, codename))
+		return self.user_has_perm(self.user, "%s.%s" % (opts.app_label, codename))
 
 	def has_delete_permission(self, **kwargs):
 		if self.opts.auto_created:
 			return self.has_change_permission()
 
 		codename = get_permission_codename('delete', self.opts)
-		return self.user.has_perm("%s.%s" % (self.opts.app_label, codename))
+		return self.user_has_perm(self.user, "%s.%s" % (self.opts.app_label, codename))
 
 
 class GenericInlineModelAdmin(InlineModelAdmin):
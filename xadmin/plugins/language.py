@@ -23,8 +23,6 @@ class SetLangView(BaseAdminView):
 
 	@filter_hook
 	def post(self, request, *args, **kwargs):
-		if 'nav_menu' in request.session:
-			del request.session['nav_menu']
 		return set_language(request)
 
 
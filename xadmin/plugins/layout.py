@@ -27,6 +27,7 @@ DEFAULT_LAYOUTS = {
 
 class GridLayoutPlugin(BaseAdminPlugin):
 	grid_layouts = []
+	active_options = ('grid_layouts',)
 
 	_active_layouts = []
 	_current_layout = None
@@ -37,7 +38,7 @@ class GridLayoutPlugin(BaseAdminPlugin):
 		return dict({'url': self.admin_view.get_query_string({LAYOUT_VAR: item['key']}), 'selected': False}, **item)
 
 	def init_request(self, *args, **kwargs):
-		active = bool(self.request.method == 'GET' and self.grid_layouts)
+		active = self.request.method == 'GET'
 		if active:
 			layouts = (type(self.grid_layouts) in (list, tuple)) and self.grid_layouts or (self.grid_layouts,)
 			self._active_layouts = [self.get_layout(l) for l in layouts]
@@ -28,10 +28,12 @@ class QuickFilterPlugin(BaseAdminPlugin):
 	quickfilter = {}
 	search_fields = ()
 	free_query_filter = True
+	active_options = ('list_quick_filter',)
 
-	def init_request(self, *args, **kwargs):
-		menu_style_accordian = hasattr(self.admin_view, 'menu_style') and self.admin_view.menu_style == 'accordion'
-		return bool(self.list_quick_filter) and not menu_style_accordian
+	@classmethod
+	def is_active(cls, admin_view_class):
+		menu_style_accordian = getattr(admin_view_class, 'menu_style', None) == 'accordion'
+		return super().is_active(admin_view_class) and not menu_style_accordian
 
 	# Media
 	def get_media(self, media):
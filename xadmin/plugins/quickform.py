@@ -264,9 +264,7 @@ class QuickAddBtnPlugin(BaseAdminPlugin):
 	quick_changebtn_db_fields = ()
 	# Always enable
 	quick_addbtn_enabled = True
-
-	def init_request(self, *args, **kwargs):
-		return self.quick_addbtn_enabled
+	active_options = ('quick_addbtn_enabled',)
 
 	def formfield_for_dbfield(self, formfield, db_field, **kwargs):
 		if db_field.name in self.quick_addbtn_fields_exclude or \
@@ -10,6 +10,7 @@ REFRESH_VAR = '_refresh'
 
 class RefreshPlugin(BaseAdminPlugin):
 	refresh_times = []
+	active_options = ('refresh_times',)
 
 	# Media
 	def get_media(self, media):
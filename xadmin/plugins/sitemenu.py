@@ -10,8 +10,9 @@ BUILDIN_STYLES = {
 class SiteMenuStylePlugin(BaseAdminPlugin):
 	menu_style = None
 
-	def init_request(self, *args, **kwargs):
-		return bool(self.menu_style) and self.menu_style in BUILDIN_STYLES
+	@classmethod
+	def is_active(cls, admin_view_class):
+		return bool(cls.menu_style) and cls.menu_style in BUILDIN_STYLES
 
 	def get_context(self, context):
 		context['menu_template'] = BUILDIN_STYLES[self.menu_style]
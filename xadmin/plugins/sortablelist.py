@@ -19,9 +19,7 @@ class SortableListPlugin(BaseAdminPlugin):
 	list_order_field = None
 	# Used in custom columns
 	list_order_display_field = None
-
-	def init_request(self, *args, **kwargs):
-		return bool(self.list_order_field)
+	active_options = ('list_order_field',)
 
 	@property
 	def is_list_sortable(self):
@@ -21,6 +21,7 @@ class ThemePlugin(BaseAdminPlugin):
 	enable_themes = False
 	user_themes = None
 	use_bootswatch = False
+	active_options = ('enable_themes',)
 
 	@cached_property
 	def default_theme(self):
@@ -30,9 +31,6 @@ class ThemePlugin(BaseAdminPlugin):
 	def bootstrap4_theme(self):
 		return static('xadmin/css/themes/bootstrap.litera.min.css')
 
-	def init_request(self, *args, **kwargs):
-		return self.enable_themes
-
 	def _get_theme(self):
 		if self.user:
 			try:
@@ -24,6 +24,7 @@ def normalize_name(name):
 class WizardFormPlugin(BaseAdminPlugin):
 	wizard_form_list = None
 	wizard_for_update = False
+	active_options = ('wizard_form_list',)
 
 	storage_name = 'formtools.wizard.storage.session.SessionStorage'
 	form_list = None
@@ -57,7 +58,6 @@ class WizardFormPlugin(BaseAdminPlugin):
 				args and not self.wizard_for_update):
 			# update view
 			return False
-		return bool(self.wizard_form_list)
 
 	def prepare_form(self, __):
 		# init storage and step helper
@@ -98,9 +98,7 @@ def do_create_revision(request):
 
 class ReversionRegisterPlugin(BaseAdminPlugin):
 	reversion_enable = False
-
-	def init_request(self, *args, **kwargs):
-		return self.reversion_enable
+	active_options = ('reversion_enable',)
 
 	def setup(self, *args, **kwargs):
 		model = getattr(self, "model", None)
@@ -127,9 +125,6 @@ class ReversionPlugin(ReversionRegisterPlugin):
 	# Used to validate permission to recover object
 	revision_recover_list_view_class = None
 
-	def init_request(self, *args, **kwargs):
-		return self.reversion_enable
-
 	def setup(self, *args, **kwargs):
 		super().setup(*args, **kwargs)
 		self._cache = {}
@@ -218,9 +213,7 @@ class ReversionPlugin(ReversionRegisterPlugin):
 
 class ActionRevisionPlugin(BaseAdminPlugin):
 	reversion_enable = False
-
-	def init_request(self, *args, **kwargs):
-		return self.reversion_enable
+	active_options = ('reversion_enable',)
 
 	def do_action(self, __, queryset):
 		with do_create_revision(self.request):
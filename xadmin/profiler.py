@@ -0,0 +1,450 @@
+"""
+Opt-in profiling of the admin requests.
+"""
+import cProfile
+import json
+import logging
+import os
+import pstats
+import re
+import secrets
+import tempfile
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.db import connections
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+
+logger = logging.getLogger('xadmin.profiler')
+
+# profiler of the hooks of the current request (None when profiling is disabled)
+current_hook_profiler = ContextVar('xadmin_hook_profiler', default=None)
+
+
+def get_hook_profiler_config():
+	config = {'enabled': False, 'header': True, 'log': True, 'limit': 20}
+	config.update(getattr(settings, 'XADMIN_HOOK_PROFILER', {}))
+	return config
+
+
+_owner_names = weakref.WeakKeyDictionary()
+
+
+def get_owner_name(obj):
+	"""Name of the view or plugin class of obj (the class merged with the options)"""
+	cls = type(obj)
+	name = _owner_names.get(cls)
+	if name is None:
+		from xadmin.sites import MergeAdminMetaclass
+		owner = getattr(cls, 'admin_view_class', None)
+		if owner is None:
+			# merged plugin classes have the plugin class as last base
+			owner = cls.__bases__[-1] if isinstance(cls, MergeAdminMetaclass) else cls
+		name = _owner_names[cls] = owner.__name__
+	return name
+
+
+class HookProfiler:
+	"""
+	Cumulative wall time and number of calls of the hooks and blocks of a request,
+	by (view or plugin class name, hook or block name). The time of a hook
+	includes the time of the hooks it calls.
+	"""
+
+	def __init__(self):
+		self.timings = {}
+		self.started = time.perf_counter()
+		self.stack = []  # (owner, name) of the running hooks and blocks
+		self._chains = {}
+
+	def add(self, owner, name, duration):
+		timing = self.timings.get((owner, name))
+		if timing is None:
+			self.timings[(owner, name)] = [duration, 1]
+		else:
+			timing[0] += duration
+			timing[1] += 1
+
+	def call(self, owner, name, func, *args, **kwargs):
+		start = time.perf_counter()
+		self.stack.append((owner, name))
+		try:
+			return func(*args, **kwargs)
+		finally:
+			self.stack.pop()
+			self.add(owner, name, time.perf_counter() - start)
+
+	def timed_filter(self, method, tag):
+		def filter_method(plugin, *args, **kwargs):
+			return self.call(get_owner_name(plugin), tag, method, plugin, *args, **kwargs)
+		return filter_method
+
+	def get_hook_chain(self, segments, tag):
+		"""Compiled hook chain (see ``compile_hook_chain``) calling the timed plugin filters"""
+		chain = self._chains.get(id(segments))
+		if chain is None or chain[0] is not segments:
+			timed = tuple(((lazy[0], self.timed_filter(lazy[1], tag), lazy[2]) if lazy else None,
+			               tuple((index, self.timed_filter(method, tag), mode) for index, method, mode in filters))
+			              for lazy, filters in segments)
+			chain = self._chains[id(segments)] = (segments, timed)
+		return chain[1]
+
+	def get_records(self, limit=None):
+		"""Timings ordered by time: [{'owner', 'name', 'time' (ms), 'calls'}]"""
+		records = [{'owner': owner, 'name': name, 'time': round(duration * 1000, 3), 'calls': calls}
+		           for (owner, name), (duration, calls) in self.timings.items()]
+		records.sort(key=lambda r: r['time'], reverse=True)
+		return records[:limit] if limit else records
+
+	def get_server_timing(self, limit=None):
+		"""Value of the Server-Timing header"""
+		metrics = ['%s.%s;dur=%.2f;desc="%d calls"' % (r['owner'], r['name'], r['time'], r['calls'])
+		           for r in self.get_records(limit)]
+		metrics.append('xadmin;dur=%.2f' % ((time.perf_counter() - self.started) * 1000))
+		return ', '.join(metrics)
+
+	def finish(self, request, response, config):
+		if config['header']:
+			response['Server-Timing'] = self.get_server_timing(config['limit'])
+		if config['log']:
+			total = (time.perf_counter() - self.started) * 1000
+			logger.info('%s %s: %.1fms in %d hooks', request.method, request.path, total, len(self.timings),
+			            extra={'xadmin_profile': {'method': request.method, 'path': request.path,
+			                                      'status': response.status_code, 'time': round(total, 3),
+			                                      'hooks': self.get_records()}})
+
+
+def render_response(view, request, *args, **kwargs):
+	"""
+	Runs the view and renders the template response (the blocks run while rendering).
+	Only used by the request profiler: the other tools wait for the render of the handler.
+	"""
+	response = view(request, *args, **kwargs)
+	if callable(getattr(response, 'render', None)) and not getattr(response, 'is_rendered', True):
+		response = response.render()
+	return response
+
+
+def call_view(view, request, args, kwargs, context, callback):
+	"""
+	Runs the view within context() and calls callback(response) once the response is
+	rendered. Template responses are rendered by the request handler (after the template
+	response middleware), within context() again; the callback may return another response.
+	"""
+	with context():
+		response = view(request, *args, **kwargs)
+	if not callable(getattr(response, 'add_post_render_callback', None)) or response.is_rendered:
+		return callback(response) or response
+	render = response.render
+
+	def render_within_context():
+		vars(response).pop('render', None)
+		with context():
+			return render()
+
+	response.render = render_within_context
+	response.add_post_render_callback(callback)
+	return response
+
+
+@contextmanager
+def use_hook_profiler(profiler):
+	token = current_hook_profiler.set(profiler)
+	try:
+		yield profiler
+	finally:
+		current_hook_profiler.reset(token)
+
+
+def profile_hooks(view, request, *args, **kwargs):
+	"""Runs the view (and the render of its template response) with the hook profiler"""
+	config = get_hook_profiler_config()
+	profiler = HookProfiler()
+
+	def finish(response):
+		profiler.finish(request, response, config)
+
+	return call_view(view, request, args, kwargs, lambda: use_hook_profiler(profiler), finish)
+
+
+PROFILE_ID_RE = re.compile(r'^\d{14}[0-9a-f]{8}$')
+PROFILE_RATE_KEY = 'xadmin_profile_rate_%d'
+
+
+def get_request_profiler_config():
+	config = {
+		'enabled': False,
+		'param': '_profile',  # query parameter or cookie that requests the profile
+		'cookie': 'xadmin_profile',
+		'directory': os.path.join(tempfile.gettempdir(), 'xadmin_profiles'),
+		'rate': (10, 3600),  # at most 10 profiles per hour (None to disable the limit)
+		'limit': 30,  # functions and allocations in the summary
+		'keep': 50,  # stored profiles
+		'cache': DEFAULT_CACHE_ALIAS,
+	}
+	config.update(getattr(settings, 'XADMIN_REQUEST_PROFILER', {}))
+	return config
+
+
+def wants_request_profile(request, config):
+	"""The superuser asked to profile the request and the rate limit allows it"""
+	if not config['enabled']:
+		return False
+	if not (config['param'] in request.GET or request.COOKIES.get(config['cookie'])):
+		return False
+	if not getattr(request.user, 'is_superuser', False):
+		return False
+	if not config['rate']:
+		return True
+	count, period = config['rate']
+	cache = caches[config['cache']]
+	key = PROFILE_RATE_KEY % (time.time() // period)
+	cache.add(key, 0, period)
+	try:
+		return cache.incr(key) <= count
+	except ValueError:
+		# the cache does not keep values (dummy cache): the rate can not be checked
+		logger.warning('The request profile rate can not be limited with the "%s" cache', config['cache'])
+		return False
+
+
+def get_profile_path(config, profile_id, ext):
+	return os.path.join(config['directory'], '%s.%s' % (profile_id, ext))
+
+
+# cProfile and tracemalloc are global to the process: one request is profiled at a time
+_request_profile_lock = threading.Lock()
+
+
+def profile_request(view, request, *args, **kwargs):
+	"""
+	Runs the view under cProfile and tracemalloc. The stats are stored in the
+	profiles directory ('<id>.prof' for pstats tools and a '<id>.json' summary).
+	Returns (response, profile id). The id is None when the request is not profiled
+	(another request is profiled, or the profile failed): profiling never changes the response.
+	"""
+	if not _request_profile_lock.acquire(blocking=False):
+		return render_response(view, request, *args, **kwargs), None
+	try:
+		config = get_request_profiler_config()
+		profile = cProfile.Profile()
+		tracing = tracemalloc.is_tracing()
+		try:
+			if not tracing:
+				tracemalloc.start()
+			profile.enable()
+		except (RuntimeError, ValueError):
+			# another profiler of the process is running
+			logger.warning('%s %s could not be profiled', request.method, request.path, exc_info=True)
+			if not tracing:
+				tracemalloc.stop()
+			return render_response(view, request, *args, **kwargs), None
+		started = time.perf_counter()
+		try:
+			try:
+				response = render_response(view, request, *args, **kwargs)
+			finally:
+				profile.disable()
+			elapsed = time.perf_counter() - started
+			try:
+				profile_id = save_request_profile(config, request, response, profile, elapsed)
+			except Exception:
+				logger.exception('The profile of %s %s could not be saved', request.method, request.path)
+				profile_id = None
+		finally:
+			if not tracing:
+				tracemalloc.stop()
+	finally:
+		_request_profile_lock.release()
+	return response, profile_id
+
+
+def save_request_profile(config, request, response, profile, elapsed):
+	"""Stores the stats and the allocations of a profiled request, returns the profile id"""
+	snapshot = tracemalloc.take_snapshot()
+	peak = tracemalloc.get_traced_memory()[1]
+	profile_id = time.strftime('%Y%m%d%H%M%S') + secrets.token_hex(4)
+	os.makedirs(config['directory'], exist_ok=True)
+	profile.dump_stats(get_profile_path(config, profile_id, 'prof'))
+
+	stats = pstats.Stats(profile).stats
+	functions = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:config['limit']]
+	summary = {
+		'id': profile_id,
+		'method': request.method,
+		'path': request.get_full_path(),
+		'user': request.user.get_username(),
+		'status': response.status_code,
+		'time': round(elapsed * 1000, 3),
+		'memory_peak': peak,
+		'functions': [{'function': pstats.func_std_string(func), 'calls': ncalls,
+		               'tottime': round(tottime * 1000, 3), 'cumtime': round(cumtime * 1000, 3)}
+		              for func, (cc, ncalls, tottime, cumtime, callers) in functions],
+		'allocations': [{'location': str(stat.traceback), 'size': stat.size, 'count': stat.count}
+		                for stat in snapshot.statistics('lineno')[:config['limit']]],
+	}
+	with open(get_profile_path(config, profile_id, 'json'), 'w') as fp:
+		json.dump(summary, fp)
+	remove_old_profiles(config)
+	return profile_id
+
+
+def remove_old_profiles(config):
+	keep = config['keep']
+	if not keep:
+		return
+	ids = sorted(name[:-5] for name in os.listdir(config['directory']) if name.endswith('.json'))
+	for profile_id in ids[:-keep]:
+		for ext in ('json', 'prof'):
+			try:
+				os.remove(get_profile_path(config, profile_id, ext))
+			except FileNotFoundError:
+				pass
+
+
+def load_request_profile(profile_id):
+	"""Summary of a stored profile (None if it does not exist)"""
+	if not PROFILE_ID_RE.match(profile_id):
+		return None
+	try:
+		with open(get_profile_path(get_request_profiler_config(), profile_id, 'json')) as fp:
+			return json.load(fp)
+	except (OSError, ValueError):
+		return None
+
+
+SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+SQL_VALUES_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+def normalize_sql(sql):
+	"""SQL with the literals and the parameters replaced by '?' and the lists of values collapsed"""
+	return SQL_VALUES_RE.sub('(...)', SQL_LITERAL_RE.sub('?', sql))
+
+
+def get_sql_inspector_config():
+	config = {
+		'enabled': False,
+		'param': '_sql',  # query parameter or cookie that requests the inspection ('json' for a JSON response)
+		'cookie': 'xadmin_sql',
+		'always': False,  # inspect every request of the superusers (the report is only on response.sql_inspection)
+		'panel': True,
+		'log': True,
+	}
+	config.update(getattr(settings, 'XADMIN_SQL_INSPECTOR', {}))
+	return config
+
+
+def sql_inspection_requested(request, config):
+	return config['param'] in request.GET or bool(request.COOKIES.get(config['cookie']))
+
+
+def wants_sql_inspection(request, config):
+	if not config['enabled'] or not getattr(request.user, 'is_superuser', False):
+		return False
+	return config['always'] or sql_inspection_requested(request, config)
+
+
+class SQLInspector:
+	"""
+	Database execute wrapper recording the queries of a request with the hook or
+	block that issued them (the innermost one run by the hook profiler).
+	"""
+
+	def __init__(self):
+		self.queries = []
+
+	def __call__(self, execute, sql, params, many, context):
+		profiler = current_hook_profiler.get()
+		source = '%s.%s' % profiler.stack[-1] if profiler is not None and profiler.stack else None
+		start = time.perf_counter()
+		try:
+			return execute(sql, params, many, context)
+		finally:
+			self.queries.append({
+				'sql': sql, 'params': repr(params), 'alias': context['connection'].alias,
+				'time': round((time.perf_counter() - start) * 1000, 3), 'source': source,
+			})
+
+	def get_report(self):
+		"""
+		Queries grouped by normalized SQL, most repeated first. 'similar' groups run
+		more than once, 'duplicates' counts the queries run again with the same parameters.
+		"""
+		groups = {}
+		for query in self.queries:
+			key = (query['alias'], normalize_sql(query['sql']))
+			group = groups.get(key)
+			if group is None:
+				group = groups[key] = {'sql': key[1], 'alias': key[0], 'count': 0, 'time': 0,
+				                       'duplicates': 0, 'sources': {}, '_params': set()}
+			group['count'] += 1
+			group['time'] += query['time']
+			group['sources'][query['source']] = group['sources'].get(query['source'], 0) + 1
+			params = (query['sql'], query['params'])
+			if params in group['_params']:
+				group['duplicates'] += 1
+			else:
+				group['_params'].add(params)
+		report = []
+		for group in groups.values():
+			del group['_params']
+			group['time'] = round(group['time'], 3)
+			group['similar'] = group['count'] > 1
+			group['sources'] = sorted(({'source': source, 'count': count} for source, count in group['sources'].items()),
+			                          key=lambda r: r['count'], reverse=True)
+			report.append(group)
+		report.sort(key=lambda g: (g['count'], g['time']), reverse=True)
+		return {
+			'count': len(self.queries),
+			'time': round(sum(q['time'] for q in self.queries), 3),
+			'duplicates': sum(g['duplicates'] for g in report),
+			'similar': sum(g['count'] for g in report if g['similar']),
+			'groups': report,
+		}
+
+
+def inspect_sql(view, request, *args, **kwargs):
+	"""
+	Runs the view recording its queries. The report is set on ``response.sql_inspection``,
+	shown in a panel of the html pages or returned as JSON with ``?_sql=json``.
+	"""
+	config = get_sql_inspector_config()
+	inspector = SQLInspector()
+	profiler = HookProfiler()
+
+	@contextmanager
+	def inspecting():
+		with ExitStack() as stack:
+			# the hook profiler keeps the stack of the running hooks used to attribute the queries
+			if current_hook_profiler.get() is None:
+				stack.enter_context(use_hook_profiler(profiler))
+			for connection in connections.all():
+				stack.enter_context(connection.execute_wrapper(inspector))
+			yield
+
+	def report_queries(response):
+		report = inspector.get_report()
+		if config['log'] and report['duplicates']:
+			logger.warning('%s %s: %d duplicate queries in %d queries', request.method, request.path,
+			               report['duplicates'], report['count'], extra={'xadmin_sql': report})
+		if request.GET.get(config['param']) == 'json':
+			response = JsonResponse(report)
+		elif config['panel'] and sql_inspection_requested(request, config) and not response.streaming \
+				and 'html' in response.get('Content-Type', ''):
+			content = response.content.decode(response.charset)
+			index = content.rfind('</body>')
+			if index != -1:
+				panel = render_to_string('xadmin/includes/sql_inspector.html', {'sql': report}, request)
+				response.content = content[:index] + panel + content[index:]
+		response.sql_inspection = report
+		return response
+
+	return call_view(view, request, args, kwargs, inspecting, report_queries)
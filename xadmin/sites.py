@@ -1,14 +1,28 @@
 # coding=utf-8
 import functools
+import gc
 import inspect
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
 from functools import update_wrapper
+from importlib import import_module
 from django.template.engine import Engine
 from django.conf import settings
-from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
 from django.db.models.base import ModelBase
-from django.urls import include, path as dj_path, re_path
+from django.http import Http404, HttpResponse
+from django.urls import include, path as dj_path, re_path, reverse, NoReverseMatch
+from django.utils.module_loading import import_string
 from django.views.decorators.cache import never_cache
 
+from xadmin.metrics import get_metrics_config, get_aggregated_metrics, get_view_labels, observe_request, \
+	observes_requests
+from xadmin.profiler import get_hook_profiler_config, profile_hooks, get_request_profiler_config, \
+	wants_request_profile, profile_request, get_sql_inspector_config, wants_sql_inspection, inspect_sql
+
 
 class AlreadyRegistered(Exception):
 	pass
@@ -85,22 +99,123 @@ class AdminPath(AdminUrl):
 	path = dj_path
 
 
+class LazyPluginModule:
+	"""Placeholder of a plugins module in the plugins registry (the module is imported
+	when a view class that uses it is built)"""
+
+	def __init__(self, module):
+		self.module = module
+
+	def __repr__(self):
+		return f'<{self.__class__.__name__} {self.module}>'
+
+
+class AdminViewCache:
+	"""
+	Cache of the merged view classes.
+	The classes are built only once per key (even with concurrent requests) and
+	the least recently used are discarded when the size limit is reached.
+	"""
+
+	def __init__(self, maxsize=None):
+		self.maxsize = maxsize
+		self._data = OrderedDict()
+		self._lock = threading.RLock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	@staticmethod
+	def freeze(value):
+		"""Converts the value to a hashable representation (used in the key of the cache)"""
+		if isinstance(value, dict):
+			return tuple(sorted(((k, AdminViewCache.freeze(v)) for k, v in value.items()), key=repr))
+		elif isinstance(value, (list, tuple)):
+			return tuple([AdminViewCache.freeze(v) for v in value])
+		elif isinstance(value, (set, frozenset)):
+			return frozenset([AdminViewCache.freeze(v) for v in value])
+		try:
+			hash(value)
+		except TypeError:
+			return 'id', id(value)
+		return value
+
+	def get(self, key, create):
+		"""Returns the class stored in the key or builds it with 'create()'"""
+		try:
+			value = self._data[key]
+		except KeyError:
+			with self._lock:
+				if (value := self._data.get(key)) is None:
+					self.misses += 1
+					self._data[key] = value = create()
+					while self.maxsize is not None and len(self._data) > self.maxsize:
+						self._data.popitem(last=False)
+						self.evictions += 1
+				else:
+					self.hits += 1
+		else:
+			self.hits += 1
+			if self.maxsize is not None:
+				with self._lock:
+					if key in self._data:
+						self._data.move_to_end(key)
+		return value
+
+	def clear(self):
+		with self._lock:
+			self._data.clear()
+
+	def __len__(self):
+		return len(self._data)
+
+	def __iter__(self):
+		return iter(list(self._data.values()))
+
+	def get_memory_size(self):
+		"""Approximate size (bytes) of the classes (view and plugins) stored in the cache"""
+		classes = set()
+		for view_class in self:
+			classes.add(view_class)
+			classes.update(getattr(view_class, 'plugin_classes', ()))
+		return sum([sys.getsizeof(cls) + sys.getsizeof(cls.__dict__) for cls in classes])
+
+	def info(self):
+		return {
+			'hits': self.hits,
+			'misses': self.misses,
+			'evictions': self.evictions,
+			'size': len(self),
+			'maxsize': self.maxsize,
+			'memory': self.get_memory_size(),
+		}
+
+
 class BaseAdminOption:
 	def __init__(self):
 		self.items = []
 		self.opts = {'__module__': __name__}
+		self._resolved = None
 
 	def append(self, admin_class):
 		self.items.append(admin_class)
+		self._resolved = None
 
 	def insert(self, index, admin_class):
 		self.items.insert(index, admin_class)
+		self._resolved = None
 
 	def __iter__(self):
 		return iter(self.items)
 
 	def __getattr__(self, name):
-		return getattr(self.resolve(), name)
+		return getattr(self.get_resolved(), name)
+
+	def get_resolved(self):
+		"""Resolved option class (keeps the same class until a new registration)"""
+		if self._resolved is None:
+			self._resolved = self.resolve()
+		return self._resolved
 
 	def get_cls_opts(self) -> dict:
 		"""Returns the attributes of the base classes."""
@@ -165,10 +280,12 @@ class AdminSite:
 		self._registry_modelviews = []
 		# url instance contains (path, admin_view class, name)
 		self._registry_plugins = {}  # admin_class class -> plugin_class class
+		self._registry_lazy_plugins = {}  # module name -> LazyPluginModule
+		self._lazy_plugins_lock = threading.RLock()
 
-		self._admin_view_cache = {}
-		self._admin_view_opts_cache = {}
+		self._admin_view_cache = AdminViewCache(getattr(settings, 'XADMIN_VIEW_CLASS_CACHE_SIZE', 4096))
 		self._admin_plugins_cache = {}
+		self._nav_menu_cache = {}
 
 		self.model_admins_order = 0
 
@@ -181,6 +298,7 @@ class AdminSite:
 			'settings': copy.copy(self._registry_settings),
 			'modelviews': copy.copy(self._registry_modelviews),
 			'plugins': copy.copy(self._registry_plugins),
+			'lazy_plugins': copy.copy(self._registry_lazy_plugins),
 		}
 
 	def restore_registry(self, data):
@@ -190,6 +308,8 @@ class AdminSite:
 		self._registry_settings = data['settings']
 		self._registry_modelviews = data['modelviews']
 		self._registry_plugins = data['plugins']
+		self._registry_lazy_plugins = data['lazy_plugins']
+		self._nav_menu_cache.clear()
 
 	def register_modelview(self, path, view_class, name):
 		from xadmin.views.base import BaseAdminView
@@ -241,11 +361,50 @@ class AdminSite:
 	def register_plugin(self, plugin_class, view_class):
 		from xadmin.views.base import BaseAdminPlugin
 		if inspect.isclass(plugin_class) and issubclass(plugin_class, BaseAdminPlugin):
-			self._registry_plugins.setdefault(view_class, []).append(plugin_class)
+			plugins = self._registry_plugins.setdefault(view_class, [])
+			# plugins of a lazy module take the place reserved for the module.
+			placeholder = self._registry_lazy_plugins.get(plugin_class.__module__)
+			if placeholder is not None and placeholder in plugins:
+				plugins.insert(plugins.index(placeholder), plugin_class)
+			else:
+				plugins.append(plugin_class)
 		else:
 			raise ImproperlyConfigured('The registered plugin class %s isn\'t subclass of %s' %
 			                           (plugin_class.__name__, BaseAdminPlugin.__name__))
 
+	def register_lazy_plugins(self, module, *view_classes):
+		"""
+		Registers a module that only registers plugins, without importing it.
+		The module is imported when a merged view of one of the 'view_classes' (or subclasses) is built.
+		:param module: module name (xadmin.plugins.actions).
+		:param view_classes: classes (or import path of the classes) the plugins of the module are registered.
+		"""
+		if module in sys.modules:
+			# the plugins of the module are already registered
+			return
+		placeholder = LazyPluginModule(module)
+		for view_class in view_classes:
+			if isinstance(view_class, str):
+				view_class = import_string(view_class)
+			self._registry_plugins.setdefault(view_class, []).append(placeholder)
+		self._registry_lazy_plugins[module] = placeholder
+
+	def load_lazy_plugins(self, view_class):
+		"""Imports the lazy plugin modules registered in the hierarchy of the view class"""
+		if not self._registry_lazy_plugins:
+			return
+		# a lock of its own: concurrent requests must not remove the same placeholder twice
+		with self._lazy_plugins_lock:
+			for klass in view_class.mro()[:-1]:  # exclude object
+				for plugin_class in list(self._registry_plugins.get(klass, ())):
+					if isinstance(plugin_class, LazyPluginModule):
+						import_module(plugin_class.module)
+						# the module plugins are already in the place of the placeholder
+						self._registry_lazy_plugins.pop(plugin_class.module, None)
+						for plugins in self._registry_plugins.values():
+							if plugin_class in plugins:
+								plugins.remove(plugin_class)
+
 	def register_plugins(self, view_class, *plugin_classes):
 		"""Plugin list register"""
 		for plugin_class in plugin_classes:
@@ -356,10 +515,19 @@ class AdminSite:
 				if model not in self._registry_avs:
 					raise NotRegistered('The admin_view_class %s is not registered' % model.__name__)
 				del self._registry_avs[model]
+		self._nav_menu_cache.clear()
 
 	def set_loginview(self, login_view):
 		self.login_view = login_view
 
+	def get_cached_nav_menu(self, key, create):
+		"""Menu (without permission filter) shared by the views of the site, created once for each key"""
+		try:
+			return self._nav_menu_cache[key]
+		except KeyError:
+			menu = self._nav_menu_cache[key] = create()
+			return menu
+
 	def has_permission(self, request):
 		"""
 		Returns True if the given HttpRequest has permission to view
@@ -410,10 +578,27 @@ class AdminSite:
 		cacheable=True.
 		"""
 
+		metrics_labels = get_view_labels(view)
+
 		def inner(request, *args, **kwargs):
 			if not self.has_permission(request) and getattr(view, 'need_site_permission', True):
 				return self.create_admin_view(self.login_view)(request, *args, **kwargs)
-			return view(request, *args, **kwargs)
+			handler = view
+			if observes_requests():
+				handler = functools.partial(observe_request, metrics_labels, view)
+			if get_hook_profiler_config()['enabled']:
+				handler = functools.partial(profile_hooks, handler)
+			if wants_sql_inspection(request, get_sql_inspector_config()):
+				handler = functools.partial(inspect_sql, handler)
+			if wants_request_profile(request, get_request_profiler_config()):
+				response, profile_id = profile_request(handler, request, *args, **kwargs)
+				if profile_id is not None:
+					try:
+						response['X-Xadmin-Profile'] = reverse('%s:request_profile' % self.name, args=(profile_id,))
+					except NoReverseMatch:
+						response['X-Xadmin-Profile'] = profile_id
+				return response
+			return handler(request, *args, **kwargs)
 
 		if not cacheable:
 			inner = never_cache(inner)
@@ -478,12 +663,13 @@ class AdminSite:
 		"""Extrai os plugins registrados na hierarquia de views"""
 		from xadmin.views import BaseAdminView
 		plugins = []
+		self.load_lazy_plugins(admin_view_class)
 		# option classes affect all plugins but the impact of this is mitigated by name caching
 		option_classes = [oc for oc in option_classes if oc]
 		for klass in admin_view_class.mro()[:-1]:  # exclude object
 			klass_options = []
 			if klass == BaseAdminView or issubclass(klass, BaseAdminView):
-				reg_avs_class = self._registry_avs.get(klass)
+				reg_avs_class = self._get_option_class(self._registry_avs.get(klass))
 				if reg_avs_class:
 					klass_options.append(reg_avs_class)
 				settings_class = self._get_settings_class(klass)
@@ -500,11 +686,23 @@ class AdminSite:
 						plugins.append(merge_func(plugin_class))
 		return plugins
 
-	def get_view_class(self, view_class, option_class=None, **opts):
+	def get_active_plugins(self, view_class_merge, plugins):
+		"""Removes the plugins that can never be activated in the merged view class"""
+		return [plugin_class for plugin_class in plugins if plugin_class.is_active(view_class_merge)]
+
+	@staticmethod
+	def _get_option_class(option_class):
+		"""Option class of the registry (the site may not be initialized yet)"""
+		if isinstance(option_class, BaseAdminOption):
+			return option_class.get_resolved()
+		return option_class
+
+	def _create_view_class(self, view_class, option_class, opts):
+		option_class = self._get_option_class(option_class)
 		plugins_options = [option_class] if option_class else []
 		merges = [option_class] if option_class else []
 		for klass in view_class.mro()[:-1]:  # exclude object
-			reg_avs_class = self._registry_avs.get(klass)
+			reg_avs_class = self._get_option_class(self._registry_avs.get(klass))
 			if reg_avs_class:
 				plugins_options.append(reg_avs_class)
 				merges.append(reg_avs_class)
@@ -513,19 +711,31 @@ class AdminSite:
 				merges.append(settings_class)
 			merges.append(klass)
 		merge_class_name = ''.join([c.__name__ for c in merges])
-		if (view_class_merge := self._admin_view_cache.get(merge_class_name)) is None:
-			plugins = self.get_plugins(view_class, *plugins_options)
-			self._admin_view_cache[merge_class_name] = view_class_merge = MergeAdminMetaclass(
-				f"{view_class.__name__}Merge{len(merges)}", tuple(merges),
-				dict({'admin_site': self,
-				      'plugin_classes': plugins,
-				      'admin_view_class': view_class,
-				      'admin_merge_class_name': merge_class_name
-				      },
-				     **opts)
-			)
+		plugins = self.get_plugins(view_class, *plugins_options)
+		view_class_merge = MergeAdminMetaclass(
+			f"{view_class.__name__}Merge{len(merges)}", tuple(merges),
+			dict({'admin_site': self,
+			      'plugin_classes': plugins,
+			      'admin_view_class': view_class,
+			      'admin_merge_class_name': merge_class_name
+			      },
+			     **opts)
+		)
+		view_class_merge.plugin_classes = self.get_active_plugins(view_class_merge, plugins)
 		return view_class_merge
 
+	def get_view_class(self, view_class, option_class=None, **opts):
+		"""Returns the view class merged with its options and plugins (cached by view, options and opts)"""
+		key = (view_class, option_class, AdminViewCache.freeze(opts) if opts else None)
+		# the plugin modules are imported before taking the lock of the cache, so an import never
+		# waits on that lock (the lazy modules only register plugins, they do not build view classes)
+		self.load_lazy_plugins(view_class)
+		return self._admin_view_cache.get(key, lambda: self._create_view_class(view_class, option_class, opts))
+
+	def get_view_cache_info(self):
+		"""Statistics of the merged view classes cache (hits, misses, evictions, size, maxsize, memory)"""
+		return self._admin_view_cache.info()
+
 	def create_admin_view(self, admin_view_class, initargs=None, initkwargs=None):
 		view_class = self.get_view_class(admin_view_class)
 		return view_class.as_view(*(initargs or ()), **(initkwargs or {}))
@@ -606,6 +816,9 @@ class AdminSite:
 		urlpatterns.append(
 			dj_path('jsi18n/', wrap(self.i18n_javascript, cacheable=True), name='jsi18n')
 		)
+		urlpatterns.append(
+			dj_path('metrics/', wrap(self.metrics_view), name='metrics')
+		)
 		# Add in each model's views.
 		for model, admin_class in self._registry.items():
 			opts = model._meta
@@ -633,6 +846,19 @@ class AdminSite:
 	def urls(self):
 		return self.get_urls(), self.name, self.app_name
 
+	def metrics_view(self, request):
+		"""
+		Metrics of the admin requests in the Prometheus text format (see
+		``XADMIN_METRICS``), for the users with the metrics permission.
+		"""
+		config = get_metrics_config()
+		if not config['enabled']:
+			raise Http404
+		if not request.user.has_perm(config['permission']):
+			raise PermissionDenied
+		return HttpResponse(get_aggregated_metrics(config).render(),
+		                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
 	def i18n_javascript(self, request):
 		"""
 		Displays the i18n JavaScript that the Django admin requires.
@@ -651,18 +877,117 @@ class AdminSite:
 			                           'in "XADMIN_I18N_JAVASCRIPT_PACKAGES"')
 		return JavaScriptCatalog.as_view(packages=packages)(request)
 
+	def _get_registry_view_specs(self, registry_views, base_view_class):
+		"""Urls (AdminUrl) of the site registry whose view is a class of admin view"""
+		tuple_list = (tuple, list)
+		for view_spec in registry_views:
+			if isinstance(view_spec, tuple_list):
+				view_spec = AdminUrl(*view_spec)
+			elif not isinstance(view_spec, AdminUrl):
+				view_spec = AdminUrl(None, view_spec)
+			if isinstance(view_spec.cls_func, tuple_list):
+				yield from self._get_registry_view_specs(view_spec.cls_func, base_view_class)
+			elif inspect.isclass(view_spec.cls_func) and issubclass(view_spec.cls_func, base_view_class):
+				yield view_spec
+
+	def get_registry_view_classes(self):
+		"""Merged view classes of all the views and model views registered on the site"""
+		from xadmin.views.base import BaseAdminView
+		view_classes = []
+		for view_spec in self._get_registry_view_specs(self._registry_views, BaseAdminView):
+			view_classes.append(self.get_view_class(view_spec.cls_func))
+		for model, admin_class in self._registry.items():
+			for view_spec in self._registry_modelviews:
+				view_classes.append(self.get_view_class(view_spec.cls_func, admin_class))
+		return view_classes
+
+	@staticmethod
+	def get_view_templates(view_class):
+		"""Names of the templates configured in the view class (attributes '*_template')"""
+		templates = set()
+		for name in dir(view_class):
+			if name.endswith('_template') and isinstance(value := getattr(view_class, name, None), str):
+				templates.add(value)
+		return templates
+
+	def compile_templates(self, view_classes=()):
+		"""Loads (compiles) the xadmin templates and the templates of the view classes"""
+		from django.template import TemplateDoesNotExist, TemplateSyntaxError
+		from django.template.loader import get_template
+		templates = set()
+		templates_dir = os.path.join(os.path.dirname(__file__), 'templates')
+		for dirpath, dirnames, filenames in os.walk(templates_dir):
+			for filename in filenames:
+				if filename.endswith('.html'):
+					path = os.path.relpath(os.path.join(dirpath, filename), templates_dir)
+					templates.add(path.replace(os.sep, '/'))
+		for view_class in view_classes:
+			templates.update(self.get_view_templates(view_class))
+		compiled = 0
+		for template_name in sorted(templates):
+			try:
+				get_template(template_name)
+			except (TemplateDoesNotExist, TemplateSyntaxError):
+				continue
+			compiled += 1
+		return compiled
+
+	def freeze(self, templates=True, gc_freeze=True):
+		"""
+		Prepares the site before the workers fork (gunicorn --preload, uwsgi master):
+		builds all the merged view and plugin classes, compiles the templates,
+		populates the url resolver and moves the objects to the permanent generation
+		of the garbage collector (gc.freeze), so the memory is shared copy-on-write
+		by the workers and the first request of each view does not pay the setup.
+
+		Example (wsgi.py):
+			application = get_wsgi_application()
+			xadmin.site.freeze()
+		"""
+		from django.urls import get_resolver
+		start = time.perf_counter()
+		view_classes = self.get_registry_view_classes()
+		plugin_classes = set()
+		for view_class in view_classes:
+			plugin_classes.update(view_class.plugin_classes)
+		info = {
+			'views': len(set(view_classes)),
+			'plugins': len(plugin_classes),
+			'templates': self.compile_templates(view_classes) if templates else 0,
+		}
+		# fills the reverse dict of the url resolver (reverse() of the first requests)
+		get_resolver().reverse_dict
+		# remove optimization cache from building plugins
+		self._admin_plugins_cache.clear()
+		if gc_freeze and hasattr(gc, 'freeze'):
+			gc.collect()
+			gc.freeze()
+		info['gc_frozen'] = gc.get_freeze_count() if hasattr(gc, 'get_freeze_count') else 0
+		info['time'] = time.perf_counter() - start
+		return info
+
 	def init(self):
 		if self.ready:
 			raise ImproperlyConfigured(f"Admin site already configured!")
 
+		from xadmin.models import connect_data_version_signals, uses_count_cache
+
 		# convert lists of options into a single class.
 		for model in list(self._registry):
 			self._registry[model] = self._registry[model].resolve()
 
+		# the cached counts are invalidated by the changes of the models of the admins caching them
+		connect_data_version_signals([model for model, admin_class in self._registry.items()
+		                              if uses_count_cache(admin_class)])
+
 		# convert lists of options into a single class.
 		for model in list(self._registry_avs):
 			self._registry_avs[model] = self._registry_avs[model].resolve()
 
+		# classes built with the option lists are discarded.
+		self._admin_view_cache.clear()
+		self._nav_menu_cache.clear()
+
 		# A ready site does not allow new registrations of views and models.
 		self.ready = True
 
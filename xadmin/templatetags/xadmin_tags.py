@@ -5,6 +5,7 @@ from django.template import Library
 from django.utils.html import escape
 from django.utils.safestring import mark_safe
 
+from xadmin.profiler import current_hook_profiler, get_owner_name
 from xadmin.util import static, vendor as util_vendor
 
 register = Library()
@@ -34,9 +35,14 @@ def view_block(context, block_name, *args, **kwargs):
 			if callable(show_block_view) and not show_block_view(view, block_name):
 				continue
 			block_funcs.append((getattr(block_func, "priority", 10), block_func))
+	profiler = current_hook_profiler.get()
 	for _, block_func in sorted(block_funcs, key=lambda x: x[0],
 	                            reverse=True):
-		result = block_func(context, nodes, *args, **kwargs)
+		if profiler is None:
+			result = block_func(context, nodes, *args, **kwargs)
+		else:
+			result = profiler.call(get_owner_name(block_func.__self__), method_name,
+			                       block_func, context, nodes, *args, **kwargs)
 		if result and isinstance(result, str):
 			nodes.append(result)
 
@@ -329,28 +329,37 @@ def boolean_icon(field_val):
 
 
 def display_for_field(value, field):
+	return get_field_formatter(field)(value)
+
+
+def get_field_formatter(field):
+	"""
+	Returns the function displaying the values of the field, with the checks
+	on the field type done once (to format many values of the same field).
+	"""
 	from xadmin.views.list import EMPTY_CHANGELIST_VALUE
 
 	if field.flatchoices:
-		return dict(field.flatchoices).get(value, EMPTY_CHANGELIST_VALUE)
+		choices = dict(field.flatchoices)
+		return lambda value: choices.get(value, EMPTY_CHANGELIST_VALUE)
 	# NullBooleanField needs special-case null-handling, so it comes
 	# before the general null test.
 	elif isinstance(field, models.BooleanField) or isinstance(field, models.NullBooleanField):
-		return boolean_icon(value)
-	elif value is None:
-		return EMPTY_CHANGELIST_VALUE
+		return boolean_icon
 	elif isinstance(field, models.DateTimeField):
-		return formats.localize(tz_localtime(value))
+		display = lambda value: formats.localize(tz_localtime(value))
 	elif isinstance(field, (models.DateField, models.TimeField)):
-		return formats.localize(value)
-	elif isinstance(field, models.DecimalField) and isinstance(value, decimal.Decimal):
-		return formats.number_format(value, field.decimal_places)
-	elif isinstance(field, models.FloatField) and isinstance(value, float):
-		return formats.number_format(value)
+		display = formats.localize
+	elif isinstance(field, models.DecimalField):
+		display = lambda value: formats.number_format(value, field.decimal_places) \
+			if isinstance(value, decimal.Decimal) else smart_str(value)
+	elif isinstance(field, models.FloatField):
+		display = lambda value: formats.number_format(value) if isinstance(value, float) else smart_str(value)
 	elif isinstance(field.remote_field, models.ManyToManyRel):
-		return ', '.join([smart_str(obj) for obj in value.all()])
+		display = lambda value: ', '.join([smart_str(obj) for obj in value.all()])
 	else:
-		return smart_str(value)
+		display = smart_str
+	return lambda value: EMPTY_CHANGELIST_VALUE if value is None else display(value)
 
 
 def display_for_value(value, boolean=False):
@@ -6,6 +6,7 @@ from xadmin.views.detail import DetailAdminView
 from xadmin.views.edit import CreateAdminView, UpdateAdminView, ModelFormAdminView
 from xadmin.views.form import FormAdminView
 from xadmin.views.list import ListAdminView
+from xadmin.views.profile import RequestProfileView
 from xadmin.views.website import IndexView, LoginView, LogoutView, UserSettingView
 
 __all__ = (
@@ -27,6 +28,7 @@ def register_builtin_views(site):
 	site.register_view(r'^logout/$', LogoutView, name='logout')
 
 	site.register_view(r'^settings/user$', UserSettingView, name='user_settings')
+	site.register_view(r'^profiles/(\w+)/$', RequestProfileView, name='request_profile')
 
 	site.register_modelview(r'^$', ListAdminView, name='%s_%s_changelist')
 	site.register_modelview(r'^add/$', CreateAdminView, name='%s_%s_add')
@@ -3,17 +3,25 @@ import datetime
 import decimal
 import django.db.models
 import functools
+import hashlib
+import inspect
+import warnings
 from collections import OrderedDict
 from inspect import getfullargspec
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
 
 from django import forms
 from django.apps import apps
 from django.conf import settings
 from django.contrib import messages
+from django.contrib import auth
 from django.contrib.auth import get_permission_codename
-from django.core.exceptions import ValidationError
+from django.contrib.auth.models import AnonymousUser, PermissionsMixin
+from django.core import signing
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.core.serializers.json import DjangoJSONEncoder
-from django.http import HttpResponse, QueryDict
+from django.http import HttpResponse
 from django.template import Context, Template
 from django.template.response import TemplateResponse
 from django.urls.base import reverse
@@ -25,11 +33,12 @@ from django.utils.http import urlencode
 from django.utils.itercompat import is_iterable
 from django.utils.safestring import mark_safe
 from django.utils.text import capfirst, Truncator
-from django.utils.translation import gettext as _
+from django.utils.translation import gettext as _, get_language
 from django.views.decorators.csrf import csrf_protect
 from django.views.generic import View
 
-from xadmin.models import Log
+from xadmin.models import Log, get_cached_permissions, get_permission_cache_config, is_permission_cache_enabled
+from xadmin.profiler import current_hook_profiler, get_owner_name
 from xadmin.util import static, json, vendor, sortkeypicker, HtmlFlatData
 
 csrf_protect_m = method_decorator(csrf_protect)
@@ -44,25 +53,119 @@ def get_content_type_for_model(obj):
 	return ContentType.objects.get_for_model(obj, for_concrete_model=False)
 
 
-def filter_chain(filters, token, func, args, kwargs):
-	"""args / kwargs : These are the arguments passed to view"""
-	if token == -1:
-		return func()
+# How the plugin filter receives the result of the parent method.
+HOOK_ARG_SELF = 0  # only self arg (parent method must return None)
+HOOK_ARG_VALUE = 1  # receives the parent result
+HOOK_ARG_LAZY = 2  # receives the parent method as callable ('__' arg)
+
+NAV_MENU_CACHE_KEY = 'xadmin_nav_menu_%s'
+
+# Signed query string of the list, sent to the views opened from the list
+LIST_QUERY_VAR = '_lq'
+LIST_QUERY_SALT = 'xadmin.list_query'
+
+
+def _get_hook_method(plugin_class, tag):
+	"""Returns the function that will be called with the plugin instance as first argument"""
+	attr = getattr(plugin_class, tag, None)
+	if inspect.isfunction(attr):
+		return attr
+
+	# static/class methods and callable objects are resolved by the instance
+	def method(plugin, *args, **kwargs):
+		return getattr(plugin, tag)(*args, **kwargs)
+
+	return method
+
+
+def compile_hook_chain(plugin_classes, tag):
+	"""
+	Resolves the plugin filters of the hook 'tag' for the sequence of active plugin classes.
+	The filters are grouped in segments [(lazy_filter, filters), ...] ordered from the innermost
+	to the outermost filter. Each filter is represented by (plugin index, function, arg mode).
+	"""
+	filters = []
+	for index, plugin_class in enumerate(plugin_classes):
+		attr = getattr(plugin_class, tag, None)
+		if not callable(attr):
+			continue
+		fargs = getfullargspec(attr)[0]
+		if len(fargs) == 1:
+			mode = HOOK_ARG_SELF
+		elif fargs[1] == '__':
+			mode = HOOK_ARG_LAZY
+		else:
+			mode = HOOK_ARG_VALUE
+		filters.append((getattr(attr, 'priority', 10), index, _get_hook_method(plugin_class, tag), mode))
+	# the filter with the highest priority receives the result of the view method first.
+	filters.sort(key=lambda x: x[0])
+	segments, lazy, eager = [], None, []
+	for priority, index, method, mode in reversed(filters):
+		if mode == HOOK_ARG_LAZY:
+			if lazy is not None or eager:
+				segments.append((lazy, tuple(eager)))
+			lazy, eager = (index, method, mode), []
+		else:
+			eager.append((index, method, mode))
+	if lazy is not None or eager:
+		segments.append((lazy, tuple(eager)))
+	return tuple(segments)
+
+
+def run_hook_chain(segments, count, plugins, func, args, kwargs):
+	"""Executes the first 'count' segments of a compiled hook chain (see compile_hook_chain)"""
+	lazy, filters = segments[count - 1]
+	if lazy is None:
+		result = func()
 	else:
-		def _inner_method():
-			fm = filters[token]
-			fargs = getfullargspec(fm)[0]
-			if len(fargs) == 1:
-				# Only self arg
-				result = func()
-				if result is None:
-					return fm()
-				else:
-					raise IncorrectPluginArg('Plugin filter method need a arg to receive parent method result.')
-			else:
-				return fm(func if fargs[1] == '__' else func(), *args, **kwargs)
+		if count > 1:
+			def parent():
+				return run_hook_chain(segments, count - 1, plugins, func, args, kwargs)
+		else:
+			parent = func
+		index, method, mode = lazy
+		result = method(plugins[index], parent, *args, **kwargs)
+	for index, method, mode in filters:
+		if mode == HOOK_ARG_VALUE:
+			result = method(plugins[index], result, *args, **kwargs)
+		elif result is None:
+			result = method(plugins[index])
+		else:
+			raise IncorrectPluginArg('Plugin filter method need a arg to receive parent method result.')
+	return result
+
+
+def has_instance_hooks(plugin):
+	"""The plugin instance replaces methods of its class (set in __init__, init_request or setup)"""
+	return any(inspect.ismethod(value) or inspect.isfunction(value) for value in plugin.__dict__.values())
+
+
+def get_hook_chains(view):
+	"""
+	Returns the cache {hook name: compiled chain} of the merged view class for the active plugins of the view.
+	When a plugin instance replaces its methods, the chains are compiled for the view only (from the instances).
+	"""
+	return _get_hook_chains_state(view)[2]
 
-		return filter_chain(filters, token - 1, _inner_method, args, kwargs)
+
+def _get_hook_chains_state(view):
+	plugins = view.plugins
+	state = view.__dict__.get('_hook_chains_state')
+	if state is None or state[0] is not plugins or state[1] != len(plugins):
+		if any(map(has_instance_hooks, plugins)):
+			state = (plugins, len(plugins), {}, plugins)
+		else:
+			view_class = type(view)
+			cache = view_class.__dict__.get('_hook_chains_cache')
+			if cache is None:
+				cache = {}
+				setattr(view_class, '_hook_chains_cache', cache)
+			key = tuple(map(type, plugins))
+			if (chains := cache.get(key)) is None:
+				chains = cache.setdefault(key, {})
+			state = (plugins, len(plugins), chains, key)
+		view.__dict__['_hook_chains_state'] = state
+	return state
 
 
 def filter_hook(func):
@@ -71,17 +174,24 @@ def filter_hook(func):
 
 	@functools.wraps(func)
 	def method(self, *args, **kwargs):
-
-		def _inner_method():
+		plugins = self.plugins
+		profiler = current_hook_profiler.get()
+		if plugins:
+			state = _get_hook_chains_state(self)
+			if (segments := state[2].get(tag)) is None:
+				# compiled from the plugin classes (or the plugin instances, see get_hook_chains)
+				segments = state[2][tag] = compile_hook_chain(state[3], tag)
+			if segments:
+				def _inner_method():
+					return func(self, *args, **kwargs)
+
+				if profiler is None:
+					return run_hook_chain(segments, len(segments), plugins, _inner_method, args, kwargs)
+				return profiler.call(get_owner_name(self), tag, run_hook_chain, profiler.get_hook_chain(segments, tag),
+				                     len(segments), plugins, _inner_method, args, kwargs)
+		if profiler is None:
 			return func(self, *args, **kwargs)
-
-		if self.plugins:
-			filters = [(getattr(getattr(p, tag), 'priority', 10), getattr(p, tag))
-			           for p in self.plugins if callable(getattr(p, tag, None))]
-			filters = [f for p, f in sorted(filters, key=lambda x: x[0])]
-			return filter_chain(filters, len(filters) - 1, _inner_method, args, kwargs)
-		else:
-			return _inner_method()
+		return profiler.call(get_owner_name(self), tag, func, self, *args, **kwargs)
 
 	return method
 
@@ -137,7 +247,198 @@ class BaseAdminMergeView:
 	pass
 
 
+class PermissionResolver:
+	"""Memoizes the permissions of the user during a request
+	(shared by all views and plugins that handle the same request)"""
+
+	def __init__(self, user):
+		self.user = user
+		self._perms = {}
+		self._views = {}
+		self._cached_perms = False
+
+	@classmethod
+	def get_for_request(cls, request):
+		resolver = getattr(request, '_xadmin_permissions', None)
+		if resolver is None or resolver.user is not request.user:
+			resolver = cls(request.user)
+			request._xadmin_permissions = resolver
+		return resolver
+
+	@staticmethod
+	def get_object_key(obj):
+		"""Identity of the object (None for objects that can not be memoized)"""
+		pk = getattr(obj, 'pk', None)
+		if pk is None:
+			return None
+		return type(obj), pk
+
+	def has_perm(self, perm, obj=None):
+		if obj is None:
+			key = (perm, None)
+		else:
+			obj_key = self.get_object_key(obj)
+			if obj_key is None:
+				return self.user.has_perm(perm, obj)
+			key = (perm, obj_key)
+		try:
+			return self._perms[key]
+		except KeyError:
+			cached_perms = self.cached_perms if obj is None else None
+			if cached_perms is not None:
+				value = self._perms[key] = perm in cached_perms
+			else:
+				value = self._perms[key] = self.user.has_perm(perm, obj)
+			return value
+
+	@property
+	def cached_perms(self):
+		"""Permission set of the user kept in the cache between requests (None if not cacheable)"""
+		if self._cached_perms is False:
+			self._cached_perms = get_cached_permissions(self.user)
+		return self._cached_perms
+
+	def has_perm_bulk(self, perm, objs):
+		"""Permission for each object of 'objs' (list of booleans)"""
+		objs = list(objs)
+		pending = {}
+		for obj in objs:
+			obj_key = self.get_object_key(obj)
+			if obj_key is not None and (perm, obj_key) not in self._perms:
+				pending.setdefault(obj_key, obj)
+		if pending:
+			values = self.user_has_perm_bulk(perm, list(pending.values()))
+			for obj_key, value in zip(pending, values):
+				self._perms[(perm, obj_key)] = value
+		return [self.has_perm(perm, obj) for obj in objs]
+
+	def user_has_perm_bulk(self, perm, objs):
+		"""
+		Validates the permission for all objects in one pass. Authentication backends
+		can answer for the whole list implementing 'has_perm_bulk(user_obj, perm, objs)'.
+		"""
+		user = self.user
+		if getattr(type(user), 'has_perm', None) not in (PermissionsMixin.has_perm, AnonymousUser.has_perm):
+			# custom permission validation of the user model
+			return [user.has_perm(perm, obj) for obj in objs]
+		if user.is_active and user.is_superuser:
+			return [True] * len(objs)
+		values = [False] * len(objs)
+		denied = set()
+		for backend in auth.get_backends():
+			pending = [i for i, value in enumerate(values) if not value and i not in denied]
+			if not pending:
+				break
+			if hasattr(backend, 'has_perm_bulk'):
+				try:
+					results = backend.has_perm_bulk(user, perm, [objs[i] for i in pending])
+				except PermissionDenied:
+					break
+			elif hasattr(backend, 'has_perm'):
+				results = []
+				for i in pending:
+					try:
+						results.append(backend.has_perm(user, perm, objs[i]))
+					except PermissionDenied:
+						denied.add(i)
+						results.append(False)
+			else:
+				continue
+			for i, result in zip(pending, results):
+				values[i] = bool(result)
+		return values
+
+	def get_view(self, key, create):
+		"""View created once for the request (used to validate permissions)"""
+		try:
+			return self._views[key]
+		except KeyError:
+			view = self._views[key] = create()
+			return view
+
+	def clear(self):
+		self._perms.clear()
+		self._views.clear()
+		self._cached_perms = False
+
+
+class QueryState:
+	"""
+	Immutable parameters of the query string (parsed once for each request).
+	Updates return new states that reuse the encoding of the unchanged parameters.
+	"""
+	__slots__ = ('_params', '_encoded', '_query_string')
+
+	def __init__(self, params=(), encoded=None):
+		self._params = dict(params)
+		self._encoded = encoded if encoded is not None else {}
+		self._query_string = None
+
+	@classmethod
+	def from_query_dict(cls, query_dict):
+		if not hasattr(query_dict, 'lists'):  # dict of get_query_params
+			return cls(query_dict.items())
+		return cls((key, list(values)) for key, values in query_dict.lists())
+
+	def __contains__(self, key):
+		return key in self._params
+
+	def __getitem__(self, key):
+		return self._params[key]
+
+	def __iter__(self):
+		return iter(self._params)
+
+	def __len__(self):
+		return len(self._params)
+
+	def get(self, key, default=None):
+		return self._params.get(key, default)
+
+	def items(self):
+		return self._params.items()
+
+	def update(self, new_params=None, remove=None):
+		"""New state without the parameters that start with 'remove' and with 'new_params'
+		(a value None removes the parameter)"""
+		if not new_params and not remove:
+			return self
+		self.urlencode()
+		params = self._params.copy()
+		if remove:
+			if isinstance(remove, str):
+				remove = [remove]
+			for key in [k for k in params if any(k.startswith(r) for r in remove)]:
+				del params[key]
+		changed = set()
+		for key, value in (new_params or {}).items():
+			if value is None:
+				params.pop(key, None)
+			else:
+				params[key] = value
+				changed.add(key)
+		encoded = {k: v for k, v in self._encoded.items() if k in params and k not in changed}
+		return QueryState(params, encoded)
+
+	def _encode(self, key):
+		try:
+			return self._encoded[key]
+		except KeyError:
+			value = self._params[key]
+			if not isinstance(value, (list, tuple)):
+				value = [value]
+			encoded = self._encoded[key] = '&'.join(urlencode({key: str(v)}) for v in value)
+			return encoded
+
+	def urlencode(self):
+		if self._query_string is None:
+			# parameters without keys are not allowed
+			self._query_string = '&'.join(filter(None, [self._encode(k) for k in self._params if k.strip()]))
+		return self._query_string
+
+
 class BaseAdminObject:
+	permission_resolver_class = PermissionResolver
 
 	def get_view(self, view_class, option_class=None, *args, **kwargs):
 		opts = kwargs.pop('opts', {})
@@ -160,56 +461,73 @@ class BaseAdminObject:
 	def get_model_perm(self, model, name):
 		return '%s.%s_%s' % (model._meta.app_label, name, model._meta.model_name)
 
+	@property
+	def permission_resolver(self):
+		"""Permission resolver of the request user"""
+		return self.permission_resolver_class.get_for_request(self.request)
+
+	def user_has_perm(self, user, perm, obj=None):
+		if user is self.request.user:
+			return self.permission_resolver.has_perm(perm, obj)
+		return user.has_perm(perm, obj)
+
+	def user_has_perm_bulk(self, user, perm, objs):
+		if user is self.request.user:
+			return self.permission_resolver.has_perm_bulk(perm, objs)
+		return [user.has_perm(perm, obj) for obj in objs]
+
 	def has_model_perm(self, model, name, user=None):
 		user = user or self.user
-		return user.has_perm(self.get_model_perm(model, name)) or (
+		return self.user_has_perm(user, self.get_model_perm(model, name)) or (
 					name == 'view' and self.has_model_perm(model, 'change', user))
 
 	def has_object_perm(self, model, name, user=None, obj=None):
 		"""Validation of permissions for the object"""
 		user = user or self.user
-		return user.has_perm(self.get_model_perm(model, name), obj) or (
+		return self.user_has_perm(user, self.get_model_perm(model, name), obj) or (
 					name == 'view' and self.has_object_perm(model, 'change', user=user, obj=obj))
 
+	def has_object_perm_bulk(self, model, name, objs, user=None):
+		"""Validation of permissions for several objects at once (list of booleans)"""
+		user = user or self.user
+		objs = list(objs)
+		values = self.user_has_perm_bulk(user, self.get_model_perm(model, name), objs)
+		if name == 'view' and not all(values):
+			pending = [obj for obj, value in zip(objs, values) if not value]
+			changes = iter(self.has_object_perm_bulk(model, 'change', pending, user=user))
+			values = [value or next(changes) for value in values]
+		return values
+
 	def get_query_params(self):
 		"""Parameter data passed in the GET request"""
 		return copy.deepcopy(self.request.GET)
 
+	@property
+	def query_state(self):
+		"""
+		Parameters of get_query_params, parsed once and shared by the views and plugins of the request
+		(views overriding get_query_params keep their own state).
+		"""
+		if type(self).get_query_params is not BaseAdminObject.get_query_params:
+			state = self.__dict__.get('_query_state')
+			if state is None:
+				state = self._query_state = QueryState.from_query_dict(self.get_query_params())
+			return state
+		state = getattr(self.request, '_xadmin_query_state', None)
+		if state is None:
+			# same parameters as get_query_params, without its copy (the state is not changed)
+			state = self.request._xadmin_query_state = QueryState.from_query_dict(self.request.GET)
+		return state
+
 	def _get_query_dict(self, new_params=None, remove=None):
-		if new_params is None:
-			new_params = {}
-		if remove is None:
-			remove = []
-		params = dict(self.get_query_params())
-		arr_keys = list(params.keys())
-		for r in remove:
-			for k in arr_keys:
-				if k.startswith(r):
-					del params[k]
-		for k, v in new_params.items():
-			if v is None:
-				if k in params:
-					del params[k]
-			else:
-				params[k] = v
-		return params
+		return dict(self.query_state.update(new_params, remove).items())
 
 	def get_query_string(self, new_params=None, remove=None):
 		"""Returns a string with the request.GET parameters
 		@type new_params: dict Add new parameters.
 		@type remove: list Remove existing parameters.
 		"""
-		q = self._get_query_dict(new_params=new_params, remove=remove)
-		query_dict = QueryDict(mutable=True)
-		for k, v in q.items():
-			# parâmetros sem chaves não será permitido
-			if not k.strip():
-				continue
-			if isinstance(v, (list, tuple)):
-				query_dict.setlist(k, v)
-			else:
-				query_dict[k] = v
-		return '?%s' % query_dict.urlencode()
+		return '?%s' % self.query_state.update(new_params, remove).urlencode()
 
 	def get_form_params(self, new_params=None, remove=None, **options):
 		"""The method extracts the parameters sent in the url and creates hidden components in the form.
@@ -288,6 +606,9 @@ class BaseAdminObject:
 @functools.total_ordering
 class BaseAdminPlugin(BaseAdminObject):
 	__order__ = 100  # load order
+	# Options (plugin attributes) that activate the plugin. When declared, the plugin is only
+	# kept in the merged view class if at least one of them has a value.
+	active_options = ()
 
 	def __init__(self, admin_view):
 		self.admin_view = admin_view
@@ -307,6 +628,12 @@ class BaseAdminPlugin(BaseAdminObject):
 	def __eq__(self, plugin):
 		return self.__order__ == plugin.__order__
 
+	@classmethod
+	def is_active(cls, admin_view_class):
+		"""Static activation of the plugin, evaluated once for each merged view class
+		(Returning False removes the plugin from the view 'plugin_classes')"""
+		return not cls.active_options or any(getattr(cls, name, None) for name in cls.active_options)
+
 	def init_request(self, *args, **kwargs):
 		"""Initializes the activation of the plugin (Returning False makes the plugin disabled)"""
 		pass
@@ -320,24 +647,54 @@ class BaseAdminPlugin(BaseAdminObject):
 		has_change_perm = self.has_object_perm(model, perm_name, obj=obj)
 		if not has_change_perm:
 			# validates permission for the object
-			opts = self.admin_site.get_registry(model, None)
-			view = self.admin_site.get_view_class(view_class, opts)()
+			view = self.get_permission_view(view_class, model, **options)
 			# The view needs to have a method for validating the object.
 			permission_method = f"has_{perm_name}_permission"
 			if not hasattr(view, permission_method):
 				return has_change_perm
-			try:
-				# remove plugin from list to not initialize recursively.
-				view.plugin_classes.remove(type(self))
-			except ValueError:
-				pass
-			request = options.get('request', self.request)
-			args = options.get('args', self.args)
-			kwargs = options.get('kwargs', self.kwargs)
-			view.setup(request, *args, **kwargs)
 			has_change_perm = getattr(view, permission_method)(obj=obj)
 		return has_change_perm
 
+	def has_object_site_perm_bulk(self, view_class, model, objs, perm_name, **options):
+		"""Permission validation for several objects at once (including the view)"""
+		objs = list(objs)
+		values = self.has_object_perm_bulk(model, perm_name, objs)
+		if not all(values):
+			view = self.get_permission_view(view_class, model, **options)
+			pending = [obj for obj, value in zip(objs, values) if not value]
+			permission_method = f"has_{perm_name}_permission"
+			if hasattr(view, permission_method + '_bulk'):
+				results = iter(getattr(view, permission_method + '_bulk')(pending))
+			elif hasattr(view, permission_method):
+				results = (getattr(view, permission_method)(obj=obj) for obj in pending)
+			else:
+				return values
+			values = [value or next(results) for value in values]
+		return values
+
+	def get_permission_view(self, view_class, model, **options):
+		"""View used to validate object permissions (created once per request)"""
+		request = options.get('request', self.request)
+		args = tuple(options.get('args', self.args))
+		kwargs = options.get('kwargs', self.kwargs)
+
+		def create():
+			opts = self.admin_site.get_registry(model, None)
+			view = self.admin_site.get_view_class(view_class, opts)()
+			# remove plugin from list to not initialize recursively.
+			view.plugin_classes = [p for p in view.plugin_classes if p is not type(self)]
+			view.setup(request, *args, **kwargs)
+			return view
+
+		key = (view_class, model, type(self), args, tuple(sorted(kwargs.items())))
+		try:
+			hash(key)
+		except TypeError:
+			return create()
+		if request is not self.request:
+			return create()
+		return self.permission_resolver.get_view(key, create)
+
 	def has_object_view_permission(self, view_class, model: django.db.models.Model, obj, **options):
 		return self.has_object_site_perm(view_class, model, obj, "view", **options)
 
@@ -429,6 +786,24 @@ class BaseAdminView(BaseAdminObject, View):
 		return view
 
 
+def force_menu_str(menus):
+	"""Menus with the lazy translations (titles, icons) converted to strings"""
+	def convert(value):
+		if isinstance(value, Promise):
+			return str(value)
+		if isinstance(value, dict):
+			return value.__class__((key, convert(item)) for key, item in value.items())
+		if isinstance(value, (list, tuple)):
+			return value.__class__(convert(item) for item in value)
+		return value
+	return convert(menus)
+
+
+def freeze_menu_option(option):
+	"""Hashable form of the menu options of a view (global_models_icon, apps_label_title, apps_icons)"""
+	return tuple(sorted((str(key), str(value)) for key, value in (option or {}).items()))
+
+
 class CommAdminView(BaseAdminView):
 	base_template = 'xadmin/base_site.html'
 	menu_template = 'xadmin/includes/sitemenu_default.html'
@@ -440,6 +815,8 @@ class CommAdminView(BaseAdminView):
 	default_model_icon = None
 	apps_label_title = {}
 	apps_icons = {}
+	# the menu of get_site_menu does not depend on the user or the request (it is built once)
+	shared_site_menu = False
 
 	def get_site_menu(self):
 		return None
@@ -528,46 +905,120 @@ class CommAdminView(BaseAdminView):
 
 		return site_menu
 
+	@filter_hook
+	def get_nav_menu_key(self):
+		"""
+		Key of the menu shared by the views of the site (the menu is built once for each key),
+		None when the menu may depend on the request: plugins of get_nav_menu, get_model_icon
+		or hidden_model_menu, and views overriding hidden_model_menu or get_site_menu
+		(unless shared_site_menu is set).
+		"""
+		if any(hasattr(plugin, name) for plugin in self.plugins
+		       for name in ('get_nav_menu', 'get_model_icon', 'hidden_model_menu')):
+			return None
+		for name in ('get_site_menu', 'hidden_model_menu'):
+			overridden = name in self.__dict__ or getattr(type(self), name) is not getattr(CommAdminView, name)
+			if overridden and not (name == 'get_site_menu' and self.shared_site_menu):
+				return None
+		# the hidden models only depend on the registry (its changes clear the shared menus)
+		return (type(self).get_site_menu, type(self).get_nav_menu, type(self).get_model_icon, get_language(),
+		        freeze_menu_option(self.global_models_icon), str(self.default_model_icon),
+		        freeze_menu_option(self.apps_label_title), freeze_menu_option(self.apps_icons))
+
+	def get_nav_menu_skeleton(self):
+		"""Menu without permission filter and the signature of its content"""
+		def create():
+			# lazy titles are translated once: the menu is pickled by the cache of the user's menus
+			menus = force_menu_str(self.get_nav_menu())
+			content = json.dumps(menus, cls=JSONEncoder, ensure_ascii=False, sort_keys=True)
+			return menus, hashlib.md5(content.encode('utf-8')).hexdigest(), not has_callable_perm(menus)
+
+		def has_callable_perm(menus):
+			return any(callable(item.get('perm')) or has_callable_perm(item.get('menus', ())) for item in menus)
+
+		if settings.DEBUG:
+			return create()
+		key = self.get_nav_menu_key()
+		if key is None:
+			return create()
+		try:
+			return self.admin_site.get_cached_nav_menu(key, create)
+		except TypeError:  # unhashable key
+			return create()
+
+	def get_menu_permission_signature(self):
+		"""Permissions that filter the menu (None if the user's menu can not be shared)"""
+		if self.user.is_active and self.user.is_superuser:
+			return 'super'
+		cached_perms = self.permission_resolver.cached_perms
+		if cached_perms is None:
+			return None
+		return ','.join(sorted(cached_perms))
+
+	def filter_nav_menu(self, menus):
+		def check_menu_permission(item):
+			need_perm = item.pop('perm', None)
+			if need_perm is None:
+				return True
+			elif callable(need_perm):
+				return need_perm(self.user)
+			elif need_perm == 'super':
+				return self.user.is_superuser
+			else:
+				return self.permission_resolver.has_perm(need_perm)
+
+		def filter_item(item):
+			if 'menus' in item:
+				before_filter_length = len(item['menus'])
+				item['menus'] = [filter_item(
+					i) for i in item['menus'] if check_menu_permission(i)]
+				after_filter_length = len(item['menus'])
+				if after_filter_length == 0 and before_filter_length > 0:
+					return None
+			return item
+
+		nav_menu = [filter_item(item) for item in menus if check_menu_permission(item)]
+		return list(filter(lambda x: x, nav_menu))
+
 	@filter_hook
 	def has_session_nav_menu(self):
-		return not settings.DEBUG and 'nav_menu' in self.request.session
+		"""
+		Deprecated: the menu is no longer stored in the session. Plugins returning True
+		make the view use the menu they stored in ``request.session['nav_menu']`` (JSON).
+		"""
+		return False
+
+	@filter_hook
+	def get_user_nav_menu(self):
+		"""
+		Menu filtered by the permissions of the user. Users with the same permissions
+		share the menu through the cache (invalidated when the menu or the permissions change).
+		"""
+		if self.has_session_nav_menu() and 'nav_menu' in self.request.session:
+			warnings.warn('has_session_nav_menu is deprecated, the menu is cached by get_user_nav_menu.',
+			              DeprecationWarning)
+			return json.loads(self.request.session['nav_menu'])
+		menus, menu_signature, shareable = self.get_nav_menu_skeleton()
+		cache_key = None
+		config = get_permission_cache_config()
+		if shareable and is_permission_cache_enabled(config) and not settings.DEBUG:
+			perm_signature = self.get_menu_permission_signature()
+			if perm_signature is not None:
+				digest = hashlib.md5((menu_signature + perm_signature).encode('utf-8')).hexdigest()
+				cache_key = NAV_MENU_CACHE_KEY % digest
+				nav_menu = caches[config['cache']].get(cache_key)
+				if nav_menu is not None:
+					return nav_menu
+		nav_menu = self.filter_nav_menu(copy.deepcopy(menus))
+		if cache_key is not None:
+			caches[config['cache']].set(cache_key, nav_menu, config['timeout'])
+		return nav_menu
 
 	@filter_hook
 	def get_context(self):
 		context = super(CommAdminView, self).get_context()
 
-		if self.has_session_nav_menu():
-			nav_menu = json.loads(self.request.session['nav_menu'])
-		else:
-			menus = copy.copy(self.get_nav_menu())
-
-			def check_menu_permission(item):
-				need_perm = item.pop('perm', None)
-				if need_perm is None:
-					return True
-				elif callable(need_perm):
-					return need_perm(self.user)
-				elif need_perm == 'super':
-					return self.user.is_superuser
-				else:
-					return self.user.has_perm(need_perm)
-
-			def filter_item(item):
-				if 'menus' in item:
-					before_filter_length = len(item['menus'])
-					item['menus'] = [filter_item(
-						i) for i in item['menus'] if check_menu_permission(i)]
-					after_filter_length = len(item['menus'])
-					if after_filter_length == 0 and before_filter_length > 0:
-						return None
-				return item
-
-			nav_menu = [filter_item(item) for item in menus if check_menu_permission(item)]
-			nav_menu = list(filter(lambda x: x, nav_menu))
-
-			if not settings.DEBUG:
-				self.request.session['nav_menu'] = json.dumps(nav_menu, cls=JSONEncoder, ensure_ascii=False)
-				self.request.session.modified = True
+		nav_menu = self.get_user_nav_menu()
 
 		def check_selected(menu, path):
 			selected = False
@@ -682,6 +1133,31 @@ class ModelAdminView(CommAdminView):
 		else:
 			return None
 
+	def get_list_query_token(self, query_string):
+		return signing.dumps([self.app_label, self.model_name, query_string], salt=LIST_QUERY_SALT, compress=True)
+
+	def add_list_query(self, url, token=None):
+		"""Adds the signed query of the list (by default the one that opened the view) to the url"""
+		token = token or self.request.GET.get(LIST_QUERY_VAR)
+		if not token:
+			return url
+		scheme, netloc, path, query, fragment = urlsplit(url)
+		query = [(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k != LIST_QUERY_VAR]
+		query.append((LIST_QUERY_VAR, token))
+		return urlunsplit((scheme, netloc, path, urlencode(query), fragment))
+
+	def get_list_query(self):
+		"""Query string of the list that opened the view (sent signed in the url)"""
+		token = self.request.GET.get(LIST_QUERY_VAR)
+		if token:
+			try:
+				app_label, model_name, query_string = signing.loads(token, salt=LIST_QUERY_SALT)
+			except (signing.BadSignature, ValueError, TypeError):
+				return ''
+			if (app_label, model_name) == self.model_info:
+				return query_string
+		return ''
+
 	def model_admin_url(self, name, *args, **kwargs):
 		"""Reverts the model url in the admin view"""
 		return self.get_model_url(self.model, name, *args, **kwargs)
@@ -728,7 +1204,7 @@ class ModelAdminView(CommAdminView):
 		:param name: permission name
 		"""
 		permission_codename = get_permission_codename(name, self.opts)
-		return self.user.has_perm('%s.%s' % (self.opts.app_label, permission_codename))
+		return self.user_has_perm(self.user, '%s.%s' % (self.opts.app_label, permission_codename))
 
 	def has_view_permission(self, obj=None):
 		return ('view' not in self.remove_permissions) and (self.has_auth_permission("view", obj) or
@@ -742,3 +1218,47 @@ class ModelAdminView(CommAdminView):
 
 	def has_delete_permission(self, obj=None):
 		return ('delete' not in self.remove_permissions) and self.has_auth_permission("delete", obj)
+
+	def has_auth_permission_bulk(self, name: str, objs):
+		"""
+		:param objs: instances of model
+		:param name: permission name
+
+		Like ``has_auth_permission``, the model permission is validated (the objects are
+		not passed to the authentication backends). Views that override
+		``has_auth_permission`` to validate object permissions are asked object by object.
+		"""
+		objs = list(objs)
+		if type(self).has_auth_permission is not ModelAdminView.has_auth_permission:
+			return [self.has_auth_permission(name, obj) for obj in objs]
+		return [self.has_auth_permission(name)] * len(objs)
+
+	def has_permission_bulk(self, name: str, objs):
+		"""
+		Validates the permission 'name' for all objects at once (list of booleans).
+		Views and options that customize 'has_<name>_permission' are asked object by object.
+		"""
+		objs = list(objs)
+		permission_method = f"has_{name}_permission"
+		if getattr(type(self), permission_method) is not getattr(ModelAdminView, permission_method):
+			return [getattr(self, permission_method)(obj) for obj in objs]
+		if name in self.remove_permissions:
+			return [False] * len(objs)
+		values = self.has_auth_permission_bulk(name, objs)
+		if name == 'view' and not all(values):
+			pending = [obj for obj, value in zip(objs, values) if not value]
+			changes = iter(self.has_auth_permission_bulk('change', pending))
+			values = [value or next(changes) for value in values]
+		return values
+
+	def has_view_permission_bulk(self, objs):
+		return self.has_permission_bulk('view', objs)
+
+	def has_add_permission_bulk(self, objs):
+		return self.has_permission_bulk('add', objs)
+
+	def has_change_permission_bulk(self, objs):
+		return self.has_permission_bulk('change', objs)
+
+	def has_delete_permission_bulk(self, objs):
+		return self.has_permission_bulk('delete', objs)
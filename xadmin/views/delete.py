@@ -108,4 +108,7 @@ class DeleteAdminView(ModelAdminView):
 
 		if not self.has_view_permission():
 			return self.get_admin_url('index')
-		return self.model_admin_url('changelist')
+		change_list_url = self.model_admin_url('changelist')
+		if list_query := self.get_list_query():
+			change_list_url += '?' + list_query
+		return change_list_url
@@ -289,6 +289,8 @@ class DetailAdminView(ModelAdminView):
 
 			'has_change_permission': self.has_change_permission(self.obj),
 			'has_delete_permission': self.has_delete_permission(self.obj),
+			'change_url': self.add_list_query(self.model_admin_url('change', self.obj.pk)),
+			'delete_url': self.add_list_query(self.model_admin_url('delete', self.obj.pk)),
 
 			'content_type_id': ContentType.objects.get_for_model(self.model).id,
 		}
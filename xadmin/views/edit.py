@@ -381,8 +381,8 @@ class ModelFormAdminView(ModelAdminView):
 		})
 
 		if self.org_obj and new_context['show_delete_link']:
-			new_context['delete_url'] = self.model_admin_url(
-				'delete', self.org_obj.pk)
+			new_context['delete_url'] = self.add_list_query(self.model_admin_url(
+				'delete', self.org_obj.pk))
 
 		context = super(ModelFormAdminView, self).get_context()
 		context.update(new_context)
@@ -596,7 +596,7 @@ class UpdateAdminView(ModelFormAdminView):
 		if "_continue" in request.POST:
 			if self.has_change_permission(obj):
 				self.message_user(msg + ' ' + _("You may edit it again below."), 'success')
-				return request.path
+				return self.add_list_query(request.path)
 			else:
 				# when the user cannot continue editing, they will only see the details screen.
 				return self.model_admin_url("detail", obj.pk)
@@ -613,8 +613,8 @@ class UpdateAdminView(ModelFormAdminView):
 				return request.POST["_redirect"]
 			elif self.has_view_permission():
 				change_list_url = self.model_admin_url('changelist')
-				if 'LIST_QUERY' in self.request.session and self.request.session['LIST_QUERY'][0] == self.model_info:
-					change_list_url += '?' + self.request.session['LIST_QUERY'][1]
+				if list_query := self.get_list_query():
+					change_list_url += '?' + list_query
 				return change_list_url
 			else:
 				return self.get_admin_url('index')
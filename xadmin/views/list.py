@@ -1,29 +1,40 @@
+import datetime
+import hashlib
+import json
 from collections import OrderedDict
 
-from django.core.exceptions import PermissionDenied, ObjectDoesNotExist
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied, ObjectDoesNotExist, ValidationError, EmptyResultSet
 from django.core.paginator import InvalidPage, Paginator
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, connections, transaction, DatabaseError
+from django.db.models import Count, Prefetch, Window
+from django.db.models.constants import LOOKUP_SEP
 from django.http import HttpResponseRedirect
 from django.template.loader import render_to_string
 from django.template.response import SimpleTemplateResponse, TemplateResponse
 from django.urls.base import NoReverseMatch
 from django.utils.encoding import force_str, smart_str
 from django.utils.html import escape, conditional_escape
+from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.safestring import mark_safe
 from django.utils.text import capfirst
 from django.utils.translation import gettext as _
 from django.core.exceptions import FieldDoesNotExist
 
-from xadmin.util import lookup_field, display_for_field, label_for_field, boolean_icon
+from xadmin.models import COUNT_CACHE_KEY, get_count_cache_config, get_data_versions
+from xadmin.util import lookup_field, get_field_formatter, label_for_field, boolean_icon, is_rel_field
 from xadmin.views.base import ModelAdminView, filter_hook, inclusion_tag, csrf_protect_m
 
 # List settings
 ALL_VAR = 'all'
 ORDER_VAR = 'o'
 PAGE_VAR = 'p'
+CURSOR_VAR = '_cursor'
 TO_FIELD_VAR = 't'
 COL_LIST_VAR = '_cols'
 ERROR_FLAG = 'e'
+WINDOW_COUNT_ATTR = '_xadmin_window_count'
 
 DOT = '.'
 
@@ -37,6 +48,25 @@ def safe_html_for_empty_result_value(text=None):
 	return mark_safe(f"<span class='text-muted'>{text}</span>")
 
 
+class ResultCount(int):
+	"""
+	Number of list results. Inexact counts (capped or estimated) render as "N+" or "~N".
+	"""
+
+	def __new__(cls, value, exact=True, capped=False):
+		count = super(ResultCount, cls).__new__(cls, value)
+		count.exact = exact
+		count.capped = capped
+		return count
+
+	def __str__(self):
+		if self.capped:
+			return '%d+' % self
+		if not self.exact:
+			return '~%d' % self
+		return '%d' % self
+
+
 class FakeMethodField:
 	"""
 	This class used when a column is an model function, wrap function as a fake field to display in select columns.
@@ -49,21 +79,80 @@ class FakeMethodField:
 		self.primary_key = False
 
 
+class ResultColumn:
+	"""
+	Render plan of a list column, resolved once per request: how the value of a
+	cell is read from the object and how it is displayed.
+	"""
+
+	def __init__(self, field_name, kind, field=None, attr=None):
+		self.field_name = field_name
+		self.kind = kind  # 'field', 'call' (admin method or callable), 'attr' (model attribute) or 'lookup'
+		self.field = field
+		self.attr = attr
+		self.allow_tags = getattr(attr, 'allow_tags', False)
+		self.boolean = getattr(attr, 'boolean', False)
+		self.displays = {}
+
+	def lookup(self, obj, admin_view):
+		"""Same result as ``lookup_field``: (field, attr, value)"""
+		if self.kind == 'field':
+			return self.field, None, getattr(obj, self.field_name)
+		if self.kind == 'call':
+			return None, self.attr, self.attr(obj)
+		if self.kind == 'attr':
+			attr = getattr(obj, self.field_name)
+			return None, attr, attr() if callable(attr) else attr
+		return lookup_field(self.field_name, obj, admin_view)
+
+	def get_display(self, field):
+		"""(is a foreign key, value formatter, nowrap) of a field of the column"""
+		display = self.displays.get(field)
+		if display is None:
+			display = self.displays[field] = (
+				isinstance(field.remote_field, models.ManyToOneRel),
+				get_field_formatter(field),
+				isinstance(field, (models.DateField, models.TimeField, models.ForeignKey)))
+		return display
+
+
 class ResultRow(dict):
-	pass
+	# '__dict__' keeps attributes set by plugins (e.g. 'css_class') working
+	__slots__ = ('cells', '__dict__')
+
+
+def lazy_list(name):
+	"""Property of a list stored in the slot 'name', allocated on first access"""
+
+	def fget(self):
+		value = getattr(self, name)
+		if value is None:
+			value = []
+			setattr(self, name, value)
+		return value
+
+	def fset(self, value):
+		setattr(self, name, value)
+
+	return property(fget, fset)
 
 
 class ResultItem:
+	__slots__ = ('_classes', 'text', '_wraps', 'tag', '_tag_attrs', 'allow_tags', '_btns', '_menus',
+	             'is_display_link', 'row', 'field_name', 'field', 'attr', 'value', '__dict__')
+
+	# most cells keep these empty, so the lists are only created when used
+	classes = lazy_list('_classes')
+	wraps = lazy_list('_wraps')
+	tag_attrs = lazy_list('_tag_attrs')
+	btns = lazy_list('_btns')
+	menus = lazy_list('_menus')
 
 	def __init__(self, field_name, row):
-		self.classes = []
+		self._classes = self._wraps = self._tag_attrs = self._btns = self._menus = None
 		self.text = '&nbsp;'
-		self.wraps = []
 		self.tag = 'td'
-		self.tag_attrs = []
 		self.allow_tags = False
-		self.btns = []
-		self.menus = []
 		self.is_display_link = False
 		self.row = row
 		self.field_name = field_name
@@ -77,18 +166,20 @@ class ResultItem:
 			self.text) if self.allow_tags else conditional_escape(self.text)
 		if force_str(text) == '':
 			text = mark_safe('&nbsp;')
-		for wrap in self.wraps:
+		for wrap in self._wraps or ():
 			text = mark_safe(wrap % text)
 		return text
 
 	@property
 	def tagattrs(self):
+		tag_attrs, classes = self._tag_attrs, self._classes
 		return mark_safe(
-			'%s%s' % ((self.tag_attrs and ' '.join(self.tag_attrs) or ''),
-			          (self.classes and (' class="%s"' % ' '.join(self.classes)) or '')))
+			'%s%s' % ((tag_attrs and ' '.join(tag_attrs) or ''),
+			          (classes and (' class="%s"' % ' '.join(classes)) or '')))
 
 
 class ResultHeader(ResultItem):
+	__slots__ = ('sortable', 'sorted', 'ascending', 'sort_priority', 'url_primary', 'url_remove', 'url_toggle')
 
 	def __init__(self, field_name, row):
 		super(ResultHeader, self).__init__(field_name, row)
@@ -104,6 +195,15 @@ class ResultHeader(ResultItem):
 		self.url_toggle = None
 
 
+class CursorJSONEncoder(DjangoJSONEncoder):
+	"""Exact values of the cursors: DjangoJSONEncoder cuts the times down to milliseconds"""
+
+	def default(self, o):
+		if isinstance(o, (datetime.datetime, datetime.time)):
+			return o.isoformat()
+		return super().default(o)
+
+
 class ListAdminView(ModelAdminView):
 	"""
 	Display models objects view. this class has ordering and simple filter features.
@@ -113,11 +213,19 @@ class ListAdminView(ModelAdminView):
 	list_empty_result_value = EMPTY_CHANGELIST_VALUE
 	list_display_links_details = False
 	list_select_related = None
+	list_only_fields = False  # load only the fields read by the columns (see list_depends_on)
+	list_depends_on = {}  # column name -> lookups read by a method column
+	list_prefetch_related = ()  # extra lookups or Prefetch objects for the method columns
 	list_per_page = 50
 	list_max_show_all = 200
 	list_exclude = ()
 	search_fields = ()
 	paginator_class = Paginator
+	list_pagination = 'offset'  # 'keyset' pages by the values of the ordering fields (no OFFSET)
+	list_count = 'exact'  # 'capped', 'estimate' or 'timeout' for large tables, 'window' to count with the page query
+	list_count_cap = 10000
+	list_count_timeout = 1000  # milliseconds
+	list_count_cache = False  # caches the counts until the data of the queried tables changes
 	ordering = None
 
 	# Change list templates
@@ -129,10 +237,11 @@ class ListAdminView(ModelAdminView):
 			raise PermissionDenied
 
 		request = self.request
-		request.session['LIST_QUERY'] = (self.model_info, self.request.META['QUERY_STRING'])
+		self.list_query_token = None
 
 		self.pk_attname = self.opts.pk.attname
 		self.lookup_opts = self.opts
+		self.result_perms = {}
 
 		# Get page number parameters from the query string.
 		try:
@@ -147,6 +256,8 @@ class ListAdminView(ModelAdminView):
 
 		if PAGE_VAR in self.params:
 			del self.params[PAGE_VAR]
+		if CURSOR_VAR in self.params:
+			del self.params[CURSOR_VAR]
 		if ERROR_FLAG in self.params:
 			del self.params[ERROR_FLAG]
 
@@ -181,18 +292,35 @@ class ListAdminView(ModelAdminView):
 		self.ordering_field_columns = self.get_ordering_field_columns()
 		self.paginator = self.get_paginator()
 
+		self.keyset = None
+		self.next_cursor = self.prev_cursor = None
+		if self.list_pagination == 'keyset':
+			self.keyset = self.get_keyset_ordering()
+
+		self.window_page = None
+		if self.list_count == 'window' and not self.show_all and self.list_pagination != 'keyset':
+			self.window_page = self.get_window_page()
+
 		# Get the number of objects, with admin filters applied.
-		self.result_count = self.paginator.count
+		self.result_count = self.get_result_count()
+		self.result_count_exact = getattr(self.result_count, 'exact', True)
 
-		self.can_show_all = self.result_count <= self.list_max_show_all
+		self.can_show_all = self.result_count_exact and self.result_count <= self.list_max_show_all
 		self.multi_page = self.result_count > self.list_per_page
 
 		# Get the list of objects to display on this page.
-		if (self.show_all and self.can_show_all) or not self.multi_page:
+		if self.window_page:
+			self.result_list = self.window_page
+		elif (self.show_all and self.can_show_all) or not self.multi_page:
 			self.result_list = self.list_queryset._clone()
+		elif self.keyset:
+			self.result_list = self.get_keyset_page()
 		else:
 			try:
-				self.result_list = self.paginator.page(self.page_num + 1).object_list
+				if self.result_count_exact:
+					self.result_list = self.paginator.page(self.page_num + 1).object_list
+				else:
+					self.result_list = self.get_inexact_page()
 			except InvalidPage:
 				if ERROR_FLAG in self.request.GET.keys():
 					return SimpleTemplateResponse('xadmin/views/invalid_setup.html', {
@@ -200,8 +328,287 @@ class ListAdminView(ModelAdminView):
 						'base_template': self.base_template
 					})
 				return HttpResponseRedirect(self.request.path + '?' + ERROR_FLAG + '=1')
-		self.has_more = self.result_count > (
-				self.list_per_page * self.page_num + len(self.result_list))
+		if self.keyset and self.multi_page and not (self.show_all and self.can_show_all):
+			self.has_more = self.next_cursor is not None
+		else:
+			self.has_more = self.result_count > (
+					self.list_per_page * self.page_num + len(self.result_list))
+
+	# Result count
+	@filter_hook
+	def get_result_count(self):
+		"""
+		Count the results with the ``list_count`` strategy. Counts are cached until
+		the data of the queried tables changes, and replace the paginator count.
+		"""
+		queryset = self.list_queryset.order_by()
+		key = self.list_count_cache and self.get_count_cache_key(queryset)
+		cache = key and caches[get_count_cache_config()['cache']]
+		cached = key and cache.get(key)
+		if cached:
+			count = ResultCount(*cached)
+		else:
+			counter = {
+				'capped': self.get_capped_count,
+				'estimate': self.get_estimated_count,
+				'timeout': self.get_timeboxed_count,
+			}.get(self.get_count_strategy(), self.get_exact_count)
+			count = counter(queryset)
+			if key:
+				cache.set(key, (int(count), getattr(count, 'exact', True), getattr(count, 'capped', False)),
+				          get_count_cache_config()['timeout'])
+		self.paginator.count = count
+		return count
+
+	def get_count_strategy(self):
+		"""
+		``list_count`` of the view. Keyset pages are reached through the cursors
+		and do not need the exact total, they use the capped count.
+		"""
+		if self.keyset and self.list_count == 'exact':
+			return 'capped'
+		return self.list_count
+
+	def get_count_cache_key(self, queryset):
+		"""
+		Cache key of the count: the compiled SQL and params of the query, and the
+		data versions of the joined tables.
+		"""
+		if not get_count_cache_config()['enabled']:
+			return None
+		query = queryset.query
+		try:
+			sql, params = query.get_compiler(using=queryset.db).as_sql()
+		except EmptyResultSet:
+			return None
+		tables = [alias.table_name for alias in query.alias_map.values()] or [self.opts.db_table]
+		signature = repr((queryset.db, sql, params, self.get_count_strategy(), self.list_count_cap,
+		                  get_data_versions(tables)))
+		return COUNT_CACHE_KEY % hashlib.md5(signature.encode('utf-8')).hexdigest()
+
+	def get_exact_count(self, queryset):
+		return self.paginator.count
+
+	@filter_hook
+	def get_window_page(self):
+		"""
+		Rows of the current page selected with ``COUNT(*) OVER ()``, so the page
+		and the total come back in one query. The total replaces the paginator
+		count; empty pages leave it to the paginator (None without window functions).
+		"""
+		queryset = self.list_queryset
+		if not connections[queryset.db].features.supports_over_clause or queryset.query.distinct:
+			return None
+		if self.page_num < 0:
+			return None
+		offset = self.page_num * self.list_per_page
+		queryset = queryset.annotate(**{WINDOW_COUNT_ATTR: Window(Count('*'))})
+		result_list = list(queryset[offset:offset + self.list_per_page])
+		if result_list:
+			self.paginator.count = getattr(result_list[0], WINDOW_COUNT_ATTR)
+		return result_list
+
+	def get_capped_count(self, queryset):
+		"""Count up to ``list_count_cap`` rows"""
+		cap = self.list_count_cap
+		count = queryset[:cap + 1].count()
+		if count > cap:
+			return ResultCount(cap, exact=False, capped=True)
+		return ResultCount(count)
+
+	def get_estimated_count(self, queryset):
+		"""
+		Planner estimate of the row count. Small or unknown estimates are
+		replaced by a capped count.
+		"""
+		estimate = self.get_count_estimate(queryset)
+		if estimate is None or estimate <= self.list_count_cap:
+			return self.get_capped_count(queryset)
+		return ResultCount(estimate, exact=False)
+
+	def get_timeboxed_count(self, queryset):
+		"""
+		Exact count that gives up after ``list_count_timeout`` milliseconds and
+		falls back to the estimate. Backends without statement timeouts count exactly.
+		"""
+		connection = connections[queryset.db]
+		timeout = int(self.list_count_timeout)
+		try:
+			if connection.vendor == 'postgresql':
+				with transaction.atomic(using=queryset.db):
+					with connection.cursor() as cursor:
+						cursor.execute('SET LOCAL statement_timeout = %s', [timeout])
+					count = queryset.count()
+					with connection.cursor() as cursor:
+						cursor.execute('SET LOCAL statement_timeout TO DEFAULT')
+				return ResultCount(count)
+			if connection.vendor == 'mysql':
+				with connection.cursor() as cursor:
+					cursor.execute('SELECT @@SESSION.max_execution_time')
+					previous = cursor.fetchone()[0]
+					cursor.execute('SET SESSION max_execution_time = %s', [timeout])
+					try:
+						return ResultCount(queryset.count())
+					finally:
+						cursor.execute('SET SESSION max_execution_time = %s', [previous])
+		except DatabaseError:
+			return self.get_estimated_count(queryset)
+		return ResultCount(queryset.count())
+
+	@filter_hook
+	def get_count_estimate(self, queryset):
+		"""Row estimate of the query planner, None when the backend has none"""
+		connection = connections[queryset.db]
+		if connection.vendor not in ('postgresql', 'mysql'):
+			return None
+		try:
+			sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+		except EmptyResultSet:
+			# the filters can not match any row (e.g. pk__in=[])
+			return 0
+		try:
+			with connection.cursor() as cursor:
+				if connection.vendor == 'postgresql':
+					cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+					plan = cursor.fetchone()[0]
+					if isinstance(plan, str):
+						plan = json.loads(plan)
+					return int(plan[0]['Plan']['Plan Rows'])
+				cursor.execute('EXPLAIN ' + sql, params)
+				columns = [col[0] for col in cursor.description]
+				row = cursor.fetchone()
+				return int(row[columns.index('rows')]) if row else None
+		except (DatabaseError, KeyError, IndexError, ValueError, TypeError):
+			return None
+
+	def get_inexact_page(self):
+		"""
+		Page of results without trusting the count. The count is corrected from
+		the rows seen, and becomes exact once the last page is reached.
+		"""
+		per_page = self.list_per_page
+		offset = self.page_num * per_page
+		if self.page_num < 0:
+			raise InvalidPage
+		result_list = list(self.list_queryset[offset:offset + per_page + 1])
+		if not result_list and self.page_num:
+			raise InvalidPage
+		seen = offset + len(result_list)
+		if len(result_list) > per_page:
+			result_list = result_list[:per_page]
+			if seen > self.result_count:
+				self.result_count = ResultCount(seen, exact=False, capped=True)
+		else:
+			self.result_count = ResultCount(seen)
+		self.paginator.count = self.result_count
+		self.result_count_exact = self.result_count.exact
+		return result_list
+
+	# Keyset pagination
+	def get_keyset_field(self, name):
+		"""Model field of the ordering lookup (None if it can not be used for keyset pagination)"""
+		opts, field = self.opts, None
+		parts = name.split(LOOKUP_SEP)
+		for index, part in enumerate(parts):
+			if part == 'pk':
+				part = opts.pk.name
+			try:
+				field = opts.get_field(part)
+			except FieldDoesNotExist:
+				return None
+			if not field.concrete or field.null or field.many_to_many:
+				return None
+			if field.is_relation:
+				# relations are ordered by the primary key only when the model has no default ordering
+				if index == len(parts) - 1 and field.related_model._meta.ordering:
+					return None
+				opts = field.related_model._meta
+		return field
+
+	@filter_hook
+	def get_keyset_ordering(self):
+		"""
+		List of (lookup, descending, field) of the queryset ordering, the last field must be unique.
+		Returns None when the ordering can not be used for keyset pagination.
+		"""
+		keyset = []
+		for item in self.list_queryset.query.order_by:
+			if not isinstance(item, str) or item == '?':
+				return None
+			descending = item.startswith('-')
+			name = item.lstrip('-')
+			field = self.get_keyset_field(name)
+			if field is None:
+				return None
+			keyset.append((name, descending, field))
+		if not keyset or not keyset[-1][2].unique or LOOKUP_SEP in keyset[-1][0]:
+			return None
+		return keyset
+
+	def get_keyset_value(self, obj, name, field):
+		for part in name.split(LOOKUP_SEP)[:-1]:
+			obj = getattr(obj, part)
+		return getattr(obj, field.attname)
+
+	def encode_cursor(self, obj, direction):
+		data = {
+			'o': [('-' if descending else '') + name for name, descending, field in self.keyset],
+			'v': [self.get_keyset_value(obj, name, field) for name, descending, field in self.keyset],
+			'd': direction
+		}
+		return urlsafe_base64_encode(json.dumps(data, cls=CursorJSONEncoder).encode('utf-8'))
+
+	def decode_cursor(self, cursor):
+		"""Values of the cursor and direction ('next' or 'prev'), None if the cursor is not valid"""
+		try:
+			data = json.loads(urlsafe_base64_decode(cursor).decode('utf-8'))
+			ordering = [('-' if descending else '') + name for name, descending, field in self.keyset]
+			if data['o'] != ordering or data['d'] not in ('next', 'prev'):
+				return None
+			values = [field.to_python(value) for (name, descending, field), value in zip(self.keyset, data['v'])]
+		except (ValueError, TypeError, KeyError, ValidationError):
+			return None
+		if len(values) != len(self.keyset):
+			return None
+		return values, data['d']
+
+	def get_keyset_filter(self, values, reverse=False):
+		"""Condition of the rows after (or before if reverse) the values of the cursor"""
+		condition = models.Q()
+		for index, (name, descending, field) in enumerate(self.keyset):
+			lookup = '%s__%s' % (name, 'lt' if descending != reverse else 'gt')
+			row_condition = models.Q(**{lookup: values[index]})
+			for (prev_name, d, f), value in zip(self.keyset[:index], values):
+				row_condition &= models.Q(**{prev_name: value})
+			condition |= row_condition
+		return condition
+
+	@filter_hook
+	def get_keyset_page(self):
+		"""Objects of the page after (or before) the cursor without OFFSET (constant cost for any page)"""
+		queryset = self.list_queryset
+		cursor = self.request.GET.get(CURSOR_VAR)
+		cursor = cursor and self.decode_cursor(cursor)
+		direction = 'next'
+		if cursor:
+			values, direction = cursor
+			queryset = queryset.filter(self.get_keyset_filter(values, reverse=direction == 'prev'))
+		if direction == 'prev':
+			queryset = queryset.reverse()
+		result_list = list(queryset[:self.list_per_page + 1])
+		has_more = len(result_list) > self.list_per_page
+		result_list = result_list[:self.list_per_page]
+		if direction == 'prev':
+			result_list.reverse()
+			has_next, has_prev = True, has_more
+		else:
+			has_next, has_prev = has_more, bool(cursor)
+		if result_list:
+			if has_next:
+				self.next_cursor = self.encode_cursor(result_list[-1], 'next')
+			if has_prev:
+				self.prev_cursor = self.encode_cursor(result_list[0], 'prev')
+		return result_list
 
 	@filter_hook
 	def get_result_list(self):
@@ -219,34 +626,200 @@ class ListAdminView(ModelAdminView):
 		# First, get queryset from base class.
 		queryset = self.queryset()
 
-		# Use select_related() if one of the list_display options is a field
-		# with a relationship and the provided queryset doesn't already have
+		# Use select_related() if one of the list_display options follows a
+		# relationship and the provided queryset doesn't already have
 		# select_related defined.
 		if not queryset.query.select_related:
 			if self.list_select_related:
 				queryset = queryset.select_related()
 			elif self.list_select_related is None:
-				related_fields = []
-				for field_name in self.list_display:
-					try:
-						field = self.opts.get_field(field_name)
-					except FieldDoesNotExist:
-						pass
-					else:
-						if isinstance(field.remote_field, models.ManyToOneRel):
-							related_fields.append(field_name)
+				related_fields = self.get_list_select_related()
 				if related_fields:
 					queryset = queryset.select_related(*related_fields)
 			else:
 				pass
 
-		# Then, set queryset ordering.
+		# Prefetch the many-to-many and reverse relations read by the columns.
+		prefetch_related = self.get_list_prefetch_related()
+		if prefetch_related:
+			queryset = queryset.prefetch_related(*prefetch_related)
+
 		ordering = self.get_ordering()
+
+		# Load only the fields read by the columns.
+		if self.list_only_fields and queryset.query.deferred_loading == (frozenset(), True):
+			only_fields = self.get_list_only_fields(ordering)
+			if only_fields:
+				queryset = queryset.only(*only_fields)
+
+		# Then, set queryset ordering.
 		queryset = queryset.order_by(*ordering)
 
 		# Return the queryset.
 		return queryset
 
+	# Column fields
+	@filter_hook
+	def get_column_lookups(self, field_name):
+		"""
+		Model lookups read by a list column, None when they are not known. Method
+		columns declare them with a ``depends_on`` attribute or in ``list_depends_on``.
+		"""
+		if not callable(field_name) and field_name in self.list_depends_on:
+			return list(self.list_depends_on[field_name])
+		if callable(field_name):
+			attr = field_name
+		else:
+			try:
+				field = self.opts.get_field(field_name)
+			except FieldDoesNotExist:
+				pass
+			else:
+				if hasattr(field, 'ct_field') and hasattr(field, 'fk_field'):
+					# generic foreign key
+					return [field.ct_field, field.fk_field]
+				return [field_name]
+			if hasattr(self, field_name) and field_name not in ('__str__', '__unicode__'):
+				attr = getattr(self, field_name)
+			elif is_rel_field(field_name, self.model):
+				return [field_name]
+			else:
+				attr = getattr(self.model, field_name, None)
+				if isinstance(attr, property):
+					attr = attr.fget
+		depends_on = getattr(attr, 'depends_on', None)
+		if depends_on is None:
+			return None
+		lookups = list(depends_on)
+		order_field = getattr(attr, 'admin_order_field', None)
+		if isinstance(order_field, str):
+			lookups.append(order_field.lstrip('-'))
+		return lookups
+
+	def get_list_lookups(self, ordering=()):
+		"""Lookups read by the displayed columns and the ordering, None if a column reads unknown fields"""
+		lookups = []
+		for field_name in OrderedDict.fromkeys(list(self.list_display) + list(self.list_display_links)):
+			column_lookups = self.get_column_lookups(field_name)
+			if column_lookups is None:
+				return None
+			lookups.extend(column_lookups)
+		for order in ordering:
+			if isinstance(order, str) and order != '?':
+				lookups.append(order.lstrip('-'))
+		return lookups
+
+	def get_lookup_tree(self, lookups):
+		"""
+		Fields read by the lookups as a tree of field names, where ``True`` stands
+		for a whole field value or related object. Unknown fields are skipped.
+		"""
+		tree = {}
+		for lookup in lookups:
+			node, parent, opts = tree, None, self.opts
+			parts = lookup.split(LOOKUP_SEP)
+			for index, part in enumerate(parts):
+				if part == 'pk':
+					part = opts.pk.name
+				try:
+					field = opts.get_field(part)
+				except FieldDoesNotExist:
+					if parent is not None:
+						# a method of the related object reads the whole object
+						parent[0][parent[1]] = True
+					break
+				if index == len(parts) - 1 or not field.is_relation or field.related_model is None:
+					node[part] = True
+					break
+				if node.get(part) is True:
+					break
+				parent = (node, part)
+				node = node.setdefault(part, {})
+				opts = field.related_model._meta
+		return tree
+
+	def get_lookup_relations(self, lookup):
+		"""
+		Relations followed by a lookup: the path of the single valued relations,
+		which can be joined, and the path up to the last relation when the lookup
+		crosses a many-to-many or reverse relation, which must be prefetched.
+		"""
+		opts, parts = self.opts, []
+		select_path = prefetch_path = None
+		for part in lookup.split(LOOKUP_SEP):
+			try:
+				field = opts.get_field(part)
+			except FieldDoesNotExist:
+				break
+			if not field.is_relation or field.related_model is None:
+				break
+			parts.append(part)
+			if prefetch_path or field.many_to_many or field.one_to_many:
+				prefetch_path = LOOKUP_SEP.join(parts)
+			else:
+				select_path = LOOKUP_SEP.join(parts)
+			opts = field.related_model._meta
+		return select_path, prefetch_path
+
+	@filter_hook
+	def get_list_select_related(self):
+		"""
+		Single valued relations joined for the displayed columns: the paths of
+		their fields, dotted lookups, declared lookups and ``admin_order_field``.
+		Columns hidden with the column chooser are not joined.
+		"""
+		related_fields = []
+		for field_name in self.list_display:
+			lookups = list(self.get_column_lookups(field_name) or ())
+			try:
+				order_field = self.get_ordering_field(field_name)
+			except AttributeError:
+				order_field = None
+			if isinstance(order_field, str):
+				lookups.append(order_field.lstrip('-'))
+			for lookup in lookups:
+				select_path = self.get_lookup_relations(lookup)[0]
+				if select_path and select_path not in related_fields:
+					related_fields.append(select_path)
+		return related_fields
+
+	@filter_hook
+	def get_list_prefetch_related(self):
+		"""
+		Lookups to prefetch for the displayed columns: ``list_prefetch_related``
+		(names or ``Prefetch`` objects) and the multi valued relations read by the columns.
+		"""
+		lookups = list(self.list_prefetch_related)
+		seen = set(lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup for lookup in lookups)
+		for field_name in self.list_display:
+			for lookup in self.get_column_lookups(field_name) or ():
+				prefetch_path = self.get_lookup_relations(lookup)[1]
+				if prefetch_path and prefetch_path not in seen:
+					seen.add(prefetch_path)
+					lookups.append(prefetch_path)
+		return lookups
+
+	def get_tree_only_fields(self, tree, opts, prefix=''):
+		fields = []
+		for name, node in tree.items():
+			field = opts.get_field(name)
+			if not field.concrete:
+				continue
+			fields.append(prefix + name)
+			if node is not True:
+				fields.extend(self.get_tree_only_fields(node, field.related_model._meta, prefix + name + LOOKUP_SEP))
+		return fields
+
+	@filter_hook
+	def get_list_only_fields(self, ordering=()):
+		"""
+		Arguments of ``QuerySet.only()`` for the list (None to load whole rows)
+		"""
+		lookups = self.get_list_lookups(ordering)
+		if lookups is None:
+			return None
+		return [self.opts.pk.name] + self.get_tree_only_fields(self.get_lookup_tree(lookups), self.opts)
+
 	# List ordering
 	def _get_default_ordering(self):
 		ordering = []
@@ -459,6 +1032,19 @@ class ListAdminView(ModelAdminView):
 				'page_num': i,
 			}))
 
+	@filter_hook
+	def get_cursor_links(self):
+		links = []
+		for title, cursor, active in ((_('First'), '', self.prev_cursor is not None),
+		                              (_('Previous'), self.prev_cursor, self.prev_cursor is not None),
+		                              (_('Next'), self.next_cursor, self.next_cursor is not None)):
+			links.append(mark_safe(render_to_string('xadmin/includes/pagination_cursor_link.html', context={
+				'page_url': escape(self.get_query_string({CURSOR_VAR: cursor or None, PAGE_VAR: None})),
+				'title': title,
+				'disabled': not active
+			})))
+		return links
+
 	# Result List methods
 	@filter_hook
 	def result_header(self, field_name, row):
@@ -557,22 +1143,27 @@ class ListAdminView(ModelAdminView):
 		Generates the actual list of data.
 		"""
 		item = ResultItem(field_name, row)
+		column = self.get_result_column(field_name)
 		try:
-			f, attr, value = lookup_field(field_name, obj, self)
+			f, attr, value = column.lookup(obj, self)
 		except (AttributeError, ObjectDoesNotExist, NoReverseMatch):
 			item.text = safe_html_for_empty_result_value(self.list_empty_result_value)
 		else:
 			if f is None:
-				item.allow_tags = getattr(attr, 'allow_tags', False)
-				boolean = getattr(attr, 'boolean', False)
+				if column.kind == 'call':
+					item.allow_tags, boolean = column.allow_tags, column.boolean
+				else:
+					item.allow_tags = getattr(attr, 'allow_tags', False)
+					boolean = getattr(attr, 'boolean', False)
 				if boolean:
 					item.allow_tags = True
 					item.text = boolean_icon(value)
 				else:
 					item.text = smart_str(value)
 			else:
-				if isinstance(f.remote_field, models.ManyToOneRel):
-					field_val = getattr(obj, f.name)
+				is_fk, display, nowrap = column.get_display(f)
+				if is_fk:
+					field_val = value if column.kind == 'field' else getattr(obj, f.name)
 					if field_val is None:
 						item.text = safe_html_for_empty_result_value(self.list_empty_result_value)
 					else:
@@ -580,10 +1171,8 @@ class ListAdminView(ModelAdminView):
 				elif value is None:
 					item.text = safe_html_for_empty_result_value(self.list_empty_result_value)
 				else:
-					item.text = display_for_field(value, f)
-				if isinstance(f, models.DateField) \
-						or isinstance(f, models.TimeField) \
-						or isinstance(f, models.ForeignKey):
+					item.text = display(value)
+				if nowrap:
 					item.classes.append('nowrap')
 
 			item.field = f
@@ -596,20 +1185,46 @@ class ListAdminView(ModelAdminView):
 			item.row['is_display_first'] = False
 			item.is_display_link = True
 			if self.list_display_links_details:
-				item_res_uri = self.model_admin_url("detail", getattr(obj, self.pk_attname))
+				item_res_uri = self.add_list_query(self.model_admin_url("detail", getattr(obj, self.pk_attname)))
 				if item_res_uri:
-					if self.has_change_permission(obj):
-						edit_url = self.model_admin_url("change", getattr(obj, self.pk_attname))
+					if self.has_result_perm(obj, 'change'):
+						edit_url = self.add_list_query(self.model_admin_url("change", getattr(obj, self.pk_attname)))
 					else:
 						edit_url = ""
+					# the wraps are '%' formatted: the quoted characters of the urls are escaped
 					item.wraps.append(
 						'<a data-res-uri="%s" href="" data-edit-uri="%s" class="details-handler" rel="tooltip" title="%s">%%s</a>'
-						% (item_res_uri, edit_url, _('Details of %s') % str(obj)))
+						% (escape(item_res_uri).replace('%', '%%'), escape(edit_url).replace('%', '%%'),
+						   escape(_('Details of %s') % str(obj)).replace('%', '%%')))
 			else:
 				if url := self.url_for_result(obj):
-					item.wraps.append('<a href="%s">%%s</a>' % url)
+					item.wraps.append('<a href="%s">%%s</a>' % escape(url).replace('%', '%%'))
 		return item
 
+	def get_result_column(self, field_name):
+		"""
+		Render plan of a list column (``ResultColumn``), resolved the way
+		``lookup_field`` resolves it and reused for all the rows of the request.
+		"""
+		columns = getattr(self, 'result_columns', None)
+		if columns is None:
+			columns = self.result_columns = {}
+		column = columns.get(field_name)
+		if column is None:
+			try:
+				column = ResultColumn(field_name, 'field', field=self.opts.get_field(field_name))
+			except FieldDoesNotExist:
+				if callable(field_name):
+					column = ResultColumn(field_name, 'call', attr=field_name)
+				elif hasattr(self, field_name) and field_name not in ('__str__', '__unicode__'):
+					column = ResultColumn(field_name, 'call', attr=getattr(self, field_name))
+				elif is_rel_field(field_name, self.model):
+					column = ResultColumn(field_name, 'lookup')
+				else:
+					column = ResultColumn(field_name, 'attr')
+			columns[field_name] = column
+		return column
+
 	@filter_hook
 	def result_row(self, obj):
 		row = ResultRow()
@@ -622,10 +1237,44 @@ class ListAdminView(ModelAdminView):
 	@filter_hook
 	def results(self):
 		results = []
+		self.result_perms = self.get_result_perms(self.result_list)
 		for obj in self.result_list:
 			results.append(self.result_row(obj))
 		return results
 
+	@filter_hook
+	def get_result_perms(self, objs):
+		"""Change and view permissions of the objects on the page (validated in bulk)"""
+		objs = list(objs)
+		changes = self.has_change_permission_bulk(objs)
+		views = iter(self.has_view_permission_bulk([obj for obj, change in zip(objs, changes) if not change]))
+		return {getattr(obj, self.pk_attname): {'change': change, 'view': change or next(views)}
+		        for obj, change in zip(objs, changes)}
+
+	def has_result_perm(self, obj, name):
+		perms = self.result_perms.get(getattr(obj, self.pk_attname))
+		if perms is None:
+			return getattr(self, f"has_{name}_permission")(obj)
+		return perms[name]
+
+	@filter_hook
+	def get_object_url(self, obj):
+		if self.has_result_perm(obj, 'change'):
+			return self.add_list_query(self.model_admin_url("change", getattr(obj, self.pk_attname)))
+		elif self.has_result_perm(obj, 'view'):
+			return self.add_list_query(self.model_admin_url("detail", getattr(obj, self.pk_attname)))
+		else:
+			return None
+
+	def add_list_query(self, url, token=None):
+		"""Adds the signed query of the list to the url (to return to the same list page)"""
+		query_string = self.request.META.get('QUERY_STRING')
+		if not query_string:
+			return url
+		if self.list_query_token is None:
+			self.list_query_token = self.get_list_query_token(query_string)
+		return super(ListAdminView, self).add_list_query(url, token or self.list_query_token)
+
 	@filter_hook
 	def url_for_result(self, result):
 		return self.get_object_url(result)
@@ -649,6 +1298,8 @@ class ListAdminView(ModelAdminView):
 		pagination_required = (not self.show_all or not self.can_show_all) and self.multi_page
 		if not pagination_required:
 			page_range = []
+		elif self.keyset:
+			page_range = self.get_cursor_links()
 		else:
 			ON_EACH_SIDE = {'normal': 5, 'small': 3}.get(page_type, 3)
 			ON_ENDS = 2
@@ -684,7 +1335,7 @@ class ListAdminView(ModelAdminView):
 			'page_num': page_num,
 			'pagination_required': pagination_required,
 			'show_all_url': need_show_all_link and self.get_query_string({ALL_VAR: ''}),
-			'page_range': map(self.get_page_number, page_range),
+			'page_range': page_range if self.keyset else map(self.get_page_number, page_range),
 			'ALL_VAR': ALL_VAR,
 			'1': 1,
 		}
@@ -0,0 +1,45 @@
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+from django.utils.translation import gettext as _
+
+from xadmin.profiler import load_request_profile, get_request_profiler_config, get_profile_path
+from xadmin.views.base import CommAdminView, filter_hook
+
+
+class RequestProfileView(CommAdminView):
+	"""
+	Summary and download of a request profiled with the request profiler (superusers only).
+	"""
+	title = _('Request profile')
+	profile_template = 'xadmin/views/request_profile.html'
+
+	def init_request(self, profile_id, *args, **kwargs):
+		if not self.user.is_superuser:
+			raise PermissionDenied
+		self.profile = load_request_profile(profile_id)
+		if self.profile is None:
+			raise Http404(_('Profile %s does not exist.') % profile_id)
+
+	@filter_hook
+	def get_context(self):
+		context = super().get_context()
+		context.update({
+			'title': self.title,
+			'profile': self.profile,
+			'download_url': '?download',
+		})
+		return context
+
+	@filter_hook
+	def get_breadcrumb(self):
+		bcs = super().get_breadcrumb()
+		bcs.append({'title': self.title})
+		return bcs
+
+	def get(self, request, profile_id, *args, **kwargs):
+		if 'download' in request.GET:
+			path = get_profile_path(get_request_profiler_config(), self.profile['id'], 'prof')
+			return FileResponse(open(path, 'rb'), as_attachment=True, filename='%s.prof' % self.profile['id'],
+			                    content_type='application/octet-stream')
+		return TemplateResponse(request, self.profile_template, self.get_context())